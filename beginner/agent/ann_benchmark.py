@@ -0,0 +1,92 @@
+"""
+Recall@k and QPS of IVFVectorStore against exact search on synthetic embeddings.
+
+    python ann_benchmark.py --sizes 10000 100000 1000000 --dim 256
+
+Vectors are drawn around random cluster centres so they look more like real
+text embeddings than isotropic noise does. Queries are perturbed data points.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from ivf_vector_store import IVFVectorStore
+from mmap_vector_store import MmapVectorStore, _normalize
+
+
+def synthetic_embeddings(
+    n: int, dim: int, n_clusters: int, rng: np.random.Generator
+) -> np.ndarray:
+    centres = rng.normal(size=(n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    noise = rng.normal(scale=0.6, size=(n, dim)).astype(np.float32)
+    return _normalize(centres[labels] + noise)
+
+
+def fill(store: MmapVectorStore, vectors: np.ndarray) -> None:
+    """Load vectors without building TextNodes, which would dominate the runtime."""
+    store._reserve(len(vectors), vectors.shape[1])
+    store._matrix[: len(vectors)] = vectors
+    store._alive[: len(vectors)] = True
+    store._ids = [str(i) for i in range(len(vectors))]
+    store._ref_doc_ids = [None] * len(vectors)
+    store._row_by_id = {node_id: row for row, node_id in enumerate(store._ids)}
+    store._size = len(vectors)
+
+
+def timed_queries(
+    store: MmapVectorStore, queries: np.ndarray, k: int, **kwargs
+) -> tuple[list, float]:
+    start = time.perf_counter()
+    results = [store.query_batch(query[None, :], k, **kwargs)[0] for query in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def recall(exact: list, approx: list, k: int) -> float:
+    hits = [len(set(e.ids) & set(a.ids)) / k for e, a in zip(exact, approx)]
+    return float(np.mean(hits))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'n':>9} {'search':>12} {'recall@k':>9} {'qps':>10}")
+    for n in args.sizes:
+        vectors = synthetic_embeddings(n, args.dim, max(16, n // 1000), rng)
+        picks = rng.integers(0, n, size=args.queries)
+        queries = _normalize(
+            vectors[picks]
+            + rng.normal(scale=0.3, size=(args.queries, args.dim)).astype(np.float32)
+        )
+
+        exact_store = MmapVectorStore()
+        fill(exact_store, vectors)
+        exact, exact_qps = timed_queries(exact_store, queries, args.k)
+        print(f"{n:>9} {'exact':>12} {1.0:>9.3f} {exact_qps:>10.1f}")
+
+        ivf = IVFVectorStore()
+        fill(ivf, vectors)
+        start = time.perf_counter()
+        ivf.train()
+        train_s = time.perf_counter() - start
+        for nprobe in args.nprobe:
+            approx, qps = timed_queries(ivf, queries, args.k, nprobe=nprobe)
+            label = f"ivf/{nprobe}"
+            score = recall(exact, approx, args.k)
+            print(f"{n:>9} {label:>12} {score:>9.3f} {qps:>10.1f}")
+        print(f"{'':>9} trained {len(ivf._centroids)} lists in {train_s:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
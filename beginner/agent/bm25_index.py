@@ -0,0 +1,287 @@
+"""
+Local BM25 keyword index with reciprocal-rank fusion, no LLM calls.
+
+Postings live in CSR form: `offsets[t]:offsets[t + 1]` slices the `rows` and
+`tfs` arrays for term id `t`. A corpus is indexed in one pass (tokenize, then a
+single sort by term id). Incremental `add` goes to a small in-memory delta that
+is merged into the CSR arrays once it passes `merge_threshold` rows; `delete`
+only tombstones rows, which `merge` then drops. On disk the arrays are `.npy`
+files opened with `mmap_mode="r"`, next to a JSON file with vocabulary and ids.
+"""
+
+import asyncio
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import BaseNode, MetadataMode, NodeWithScore, QueryBundle
+from llama_index.core.storage.docstore.types import BaseDocumentStore
+
+from mmap_vector_store import top_k
+from process_pool import cpu_bound
+from reranker import STOPWORDS
+
+PERSIST_NAME = "bm25"
+TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75, merge_threshold: int = 1024):
+        self.k1 = k1
+        self.b = b
+        self.merge_threshold = merge_threshold
+        self.vocab: dict[str, int] = {}
+        self.node_ids: list[str] = []
+        self._row_by_id: dict[str, int] = {}
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.rows = np.zeros(0, dtype=np.int32)
+        self.tfs = np.zeros(0, dtype=np.uint16)
+        self.doc_len = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        # rows added since the last merge: term id -> [(row, tf)]
+        self._delta: dict[int, list[tuple[int, int]]] = {}
+        self._delta_rows = 0
+        self._total_len = 0
+
+    @property
+    def num_docs(self) -> int:
+        return len(self._row_by_id)
+
+    # -- writes ---------------------------------------------------------------
+
+    def _term_id(self, term: str) -> int:
+        term_id = self.vocab.get(term)
+        if term_id is None:
+            term_id = self.vocab[term] = len(self.vocab)
+        return term_id
+
+    def _append_docs(
+        self, node_ids: list[str], texts: Iterable[str]
+    ) -> list[tuple[int, int, int]]:
+        """Register rows and return their (term id, row, tf) triples."""
+        self.delete(node_ids)
+        triples = []
+        lengths = []
+        start = len(self.node_ids)
+        for row, (node_id, text) in enumerate(zip(node_ids, texts), start=start):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            triples.extend((self._term_id(t), row, tf) for t, tf in counts.items())
+            self.node_ids.append(node_id)
+            self._row_by_id[node_id] = row
+
+        self.doc_len = np.concatenate([self.doc_len, np.asarray(lengths, np.int32)])
+        self.alive = np.concatenate([self.alive, np.ones(len(lengths), dtype=bool)])
+        self._total_len += sum(lengths)
+        return triples
+
+    @classmethod
+    def from_nodes(cls, nodes: list[BaseNode], **kwargs) -> "BM25Index":
+        """Index `nodes` in one pass."""
+        return cls.from_texts(
+            [node.node_id for node in nodes],
+            [node.get_content(MetadataMode.NONE) for node in nodes],
+            **kwargs,
+        )
+
+    @classmethod
+    def from_texts(
+        cls, node_ids: list[str], texts: Iterable[str], **kwargs
+    ) -> "BM25Index":
+        index = cls(**kwargs)
+        triples = index._append_docs(node_ids, texts)
+        index._load_triples(np.asarray(triples, dtype=np.int64).reshape(-1, 3))
+        return index
+
+    def _load_triples(self, triples: np.ndarray) -> None:
+        order = np.argsort(triples[:, 0], kind="stable")
+        triples = triples[order]
+        counts = np.bincount(triples[:, 0], minlength=len(self.vocab))
+        self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.rows = triples[:, 1].astype(np.int32)
+        self.tfs = np.minimum(triples[:, 2], np.iinfo(np.uint16).max).astype(np.uint16)
+
+    def add(self, nodes: list[BaseNode]) -> None:
+        triples = self._append_docs(
+            [node.node_id for node in nodes],
+            (node.get_content(MetadataMode.NONE) for node in nodes),
+        )
+        for term_id, row, tf in triples:
+            self._delta.setdefault(term_id, []).append((row, tf))
+        self._delta_rows += len(nodes)
+        if self._delta_rows >= self.merge_threshold:
+            self.merge()
+
+    def delete(self, node_ids: Iterable[str]) -> None:
+        for node_id in node_ids:
+            row = self._row_by_id.pop(node_id, None)
+            if row is not None:
+                self.alive[row] = False
+                self._total_len -= int(self.doc_len[row])
+
+    def merge(self) -> None:
+        """Fold the delta into the CSR arrays and drop deleted rows."""
+        term_ids = np.repeat(np.arange(len(self.offsets) - 1), np.diff(self.offsets))
+        parts = [np.stack([term_ids, self.rows, self.tfs], axis=1).astype(np.int64)]
+        for term_id, postings in self._delta.items():
+            delta = np.asarray(postings, dtype=np.int64)
+            term_column = np.full((len(delta), 1), term_id, dtype=np.int64)
+            parts.append(np.hstack([term_column, delta]))
+        triples = np.concatenate(parts)
+
+        # renumber live rows densely
+        live = np.flatnonzero(self.alive)
+        new_row = np.full(len(self.alive), -1, dtype=np.int64)
+        new_row[live] = np.arange(len(live))
+        triples[:, 1] = new_row[triples[:, 1]]
+        triples = triples[triples[:, 1] >= 0]
+
+        self.node_ids = [self.node_ids[row] for row in live]
+        self._row_by_id = {node_id: row for row, node_id in enumerate(self.node_ids)}
+        self.doc_len = np.asarray(self.doc_len[live], dtype=np.int32)
+        self.alive = np.ones(len(live), dtype=bool)
+        self._delta = {}
+        self._delta_rows = 0
+        self._load_triples(triples)
+
+    # -- reads ----------------------------------------------------------------
+
+    def _postings(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        if term_id < len(self.offsets) - 1:
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            rows, tfs = self.rows[start:end], self.tfs[start:end]
+        else:
+            rows, tfs = self.rows[:0], self.tfs[:0]
+        delta = self._delta.get(term_id)
+        if delta:
+            extra = np.asarray(delta, dtype=np.int64)
+            rows = np.concatenate([rows, extra[:, 0]])
+            tfs = np.concatenate([tfs, extra[:, 1]])
+        return rows, tfs
+
+    def search(self, query: str, k: int = 10) -> list[tuple[str, float]]:
+        n_docs = self.num_docs
+        if n_docs == 0:
+            return []
+        avgdl = self._total_len / n_docs or 1.0
+        scores = np.zeros(len(self.alive), dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            rows, tfs = self._postings(term_id)
+            live = self.alive[rows]
+            rows, tfs = rows[live], tfs[live].astype(np.float32)
+            if len(rows) == 0:
+                continue
+            idf = math.log(1 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_len[rows] / avgdl)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        matched = int(np.count_nonzero(scores))
+        idx, best = top_k(scores, min(k, matched))
+        return [(self.node_ids[row], float(s)) for row, s in zip(idx, best)]
+
+    # -- persistence ----------------------------------------------------------
+
+    def persist(self, persist_dir: str) -> None:
+        if self._delta or not self.alive.all():
+            self.merge()
+        base = Path(persist_dir) / PERSIST_NAME
+        base.parent.mkdir(parents=True, exist_ok=True)
+        for name in ("offsets", "rows", "tfs", "doc_len"):
+            np.save(f"{base}.{name}.npy", getattr(self, name))
+        meta = {"k1": self.k1, "b": self.b, "vocab": self.vocab, "ids": self.node_ids}
+        Path(f"{base}.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, **kwargs) -> "BM25Index":
+        """Open a persisted index with its postings memory-mapped, or a new one."""
+        base = Path(persist_dir) / PERSIST_NAME
+        meta_path = Path(f"{base}.json")
+        if not meta_path.exists():
+            return cls(**kwargs)
+
+        meta = json.loads(meta_path.read_text())
+        index = cls(k1=meta["k1"], b=meta["b"], **kwargs)
+        index.vocab = meta["vocab"]
+        index.node_ids = meta["ids"]
+        index._row_by_id = {node_id: row for row, node_id in enumerate(index.node_ids)}
+        for name in ("offsets", "rows", "tfs", "doc_len"):
+            setattr(index, name, np.load(f"{base}.{name}.npy", mmap_mode="r"))
+        index.alive = np.ones(len(index.node_ids), dtype=bool)
+        index._total_len = int(np.sum(index.doc_len))
+        return index
+
+
+@cpu_bound
+def build_bm25(node_ids: list[str], texts: list[str], **kwargs) -> BM25Index:
+    """`BM25Index.from_texts` for the process pool."""
+    return BM25Index.from_texts(node_ids, texts, **kwargs)
+
+
+class BM25Retriever(BaseRetriever):
+    def __init__(
+        self,
+        index: BM25Index,
+        docstore: BaseDocumentStore,
+        similarity_top_k: int = 5,
+    ) -> None:
+        super().__init__()
+        self.index = index
+        self.docstore = docstore
+        self.similarity_top_k = similarity_top_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        hits = self.index.search(query_bundle.query_str, self.similarity_top_k)
+        return [
+            NodeWithScore(node=self.docstore.get_node(node_id), score=score)
+            for node_id, score in hits
+        ]
+
+
+def reciprocal_rank_fusion(
+    result_lists: list[list[NodeWithScore]], k: int = 60, top_n: int | None = None
+) -> list[NodeWithScore]:
+    """Merge ranked lists by sum of 1 / (k + rank); scores become the fused score."""
+    fused: dict[str, float] = {}
+    nodes: dict[str, NodeWithScore] = {}
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            node_id = result.node.node_id
+            fused[node_id] = fused.get(node_id, 0.0) + 1.0 / (k + rank)
+            nodes.setdefault(node_id, result)
+
+    ranked = sorted(fused, key=fused.get, reverse=True)[:top_n]
+    return [NodeWithScore(node=nodes[n].node, score=fused[n]) for n in ranked]
+
+
+class FusionRetriever(BaseRetriever):
+    """Runs several retrievers concurrently and fuses their rankings."""
+
+    def __init__(
+        self, retrievers: list[BaseRetriever], top_n: int = 5, rrf_k: int = 60
+    ) -> None:
+        super().__init__()
+        self.retrievers = retrievers
+        self.top_n = top_n
+        self.rrf_k = rrf_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        results = [r.retrieve(query_bundle) for r in self.retrievers]
+        return reciprocal_rank_fusion(results, self.rrf_k, self.top_n)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> list[NodeWithScore]:
+        results = await asyncio.gather(
+            *(r.aretrieve(query_bundle) for r in self.retrievers)
+        )
+        return reciprocal_rank_fusion(list(results), self.rrf_k, self.top_n)
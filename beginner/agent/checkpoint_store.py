@@ -0,0 +1,186 @@
+"""
+Delta-based, disk-backed checkpoints for paused workflow contexts.
+
+`Context.to_dict()` is flattened into path keys ("state/state_data/_data/memory")
+and only keys whose content changed since the previous checkpoint are written.
+"/" and "%" inside a key are percent-escaped, so a state key like "a/b" stays one
+key instead of becoming a nested dict.
+Large values are zlib-compressed. `load` rebuilds the full dict; `get` reads a
+single key without touching the rest of the run.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any
+
+# event and step names contain dots, so paths use slashes
+SEPARATOR = "/"
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace("%", "%25").replace(SEPARATOR, "%2F")
+
+
+def _unescape(segment: str) -> str:
+    return segment.replace("%2F", SEPARATOR).replace("%25", "%")
+
+
+def flatten(
+    data: dict[str, Any], max_depth: int = 4, prefix: str = ""
+) -> dict[str, Any]:
+    """Split nested dicts into path keys, down to `max_depth` levels."""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{SEPARATOR}{_escape(key)}" if prefix else _escape(key)
+        if isinstance(value, dict) and value and max_depth > 1:
+            flat.update(flatten(value, max_depth - 1, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def unflatten(flat: dict[str, Any]) -> dict[str, Any]:
+    data: dict[str, Any] = {}
+    for path, value in flat.items():
+        *parents, leaf = path.split(SEPARATOR)
+        node = data
+        for parent in parents:
+            node = node.setdefault(_unescape(parent), {})
+        node[_unescape(leaf)] = value
+    return data
+
+
+class CheckpointStore(ABC):
+    """Interface for checkpoint backends."""
+
+    @abstractmethod
+    def save(self, run_id: str, ctx_dict: dict[str, Any]) -> int:
+        """Persist a checkpoint; returns the number of keys written."""
+
+    @abstractmethod
+    def load(self, run_id: str) -> dict[str, Any] | None: ...
+
+    @abstractmethod
+    def get(self, run_id: str, key: str) -> Any: ...
+
+    @abstractmethod
+    def delete(self, run_id: str) -> None: ...
+
+    async def asave(self, run_id: str, ctx_dict: dict[str, Any]) -> int:
+        return await asyncio.to_thread(self.save, run_id, ctx_dict)
+
+    async def aload(self, run_id: str) -> dict[str, Any] | None:
+        return await asyncio.to_thread(self.load, run_id)
+
+
+class SqliteCheckpointStore(CheckpointStore):
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        compress_over: int = 1024,
+        max_depth: int = 4,
+    ) -> None:
+        self.compress_over = compress_over
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " run_id TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " digest BLOB NOT NULL,"
+            " compressed INTEGER NOT NULL,"
+            " value BLOB NOT NULL,"
+            " PRIMARY KEY (run_id, key))"
+        )
+        self._conn.commit()
+
+    def _encode(self, value: Any) -> tuple[bytes, bytes, int]:
+        raw = json.dumps(value, sort_keys=True).encode()
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        if len(raw) > self.compress_over:
+            return digest, zlib.compress(raw), 1
+        return digest, raw, 0
+
+    @staticmethod
+    def _decode(value: bytes, compressed: int) -> Any:
+        if compressed:
+            value = zlib.decompress(value)
+        return json.loads(value)
+
+    def save(self, run_id: str, ctx_dict: dict[str, Any]) -> int:
+        flat = flatten(ctx_dict, self.max_depth)
+        with self._lock:
+            previous = dict(
+                self._conn.execute(
+                    "SELECT key, digest FROM checkpoints WHERE run_id = ?", (run_id,)
+                )
+            )
+            rows = []
+            for key, value in flat.items():
+                digest, blob, compressed = self._encode(value)
+                if previous.get(key) != digest:
+                    rows.append((run_id, key, digest, compressed, blob))
+            removed = [(run_id, key) for key in previous.keys() - flat.keys()]
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?)", rows
+                )
+                self._conn.executemany(
+                    "DELETE FROM checkpoints WHERE run_id = ? AND key = ?", removed
+                )
+        return len(rows)
+
+    def load(self, run_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, compressed, value FROM checkpoints WHERE run_id = ?",
+                (run_id,),
+            ).fetchall()
+        if not rows:
+            return None
+        return unflatten(
+            {key: self._decode(value, compressed) for key, compressed, value in rows}
+        )
+
+    def get(self, run_id: str, key: str) -> Any:
+        """Read one flattened key, or the subtree under it.
+
+        `key` is a flattened path, so "/" and "%" inside a segment must be
+        escaped as "%2F" and "%25".
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, compressed, value FROM checkpoints"
+                " WHERE run_id = ? AND (key = ? OR key LIKE ? ESCAPE '\\')",
+                (run_id, key, _like_prefix(key)),
+            ).fetchall()
+        if not rows:
+            raise KeyError(key)
+        if len(rows) == 1 and rows[0][0] == key:
+            return self._decode(rows[0][2], rows[0][1])
+        subtree = {
+            row_key[len(key) + 1 :]: self._decode(value, compressed)
+            for row_key, compressed, value in rows
+        }
+        return unflatten(subtree)
+
+    def delete(self, run_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _like_prefix(key: str) -> str:
+    escaped = key.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped + SEPARATOR + "%"
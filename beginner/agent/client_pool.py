@@ -0,0 +1,386 @@
+"""
+Process-wide OpenAI clients sharing one pooled, keep-alive HTTP connection pool.
+
+`get_llm` and `get_embed_model` return one LlamaIndex object per model and
+settings, and all of them send requests through the same two httpx clients (sync
+and async), so TCP/TLS connections opened by one workflow are reused by the next
+instead of every `OpenAI(...)` object growing its own pool. Async connections
+belong to the event loop that opened them, so the async transport keeps one pool
+per running loop (`asyncio.run`, `asyncio_run` in worker threads, ...).
+
+`configure_pool()` or the OPENAI_POOL_SIZE / OPENAI_POOL_KEEPALIVE /
+OPENAI_HTTP2 env vars size the pool and turn on HTTP/2 (needs `httpx[http2]`).
+`awarm_up()` / `warm_up()` pre-open connections at startup so the first real
+request skips the handshake. `pool_stats()` reports requests, connections
+opened, the reuse rate and how busy the pools are. `max_connections` applies
+per pool (the sync pool and each loop's async pool), so `peak_utilization` is
+the busiest single pool's peak against it.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import httpx
+from llama_index.embeddings.openai import OpenAIEmbedding
+from llama_index.llms.openai import OpenAI
+from llama_index.llms.openai.base import DEFAULT_OPENAI_MODEL
+
+DEFAULT_API_BASE = "https://api.openai.com/v1"
+
+
+def _env_int(name: str, default: int) -> Callable[[], int]:
+    return lambda: int(os.environ.get(name, default))
+
+
+@dataclass
+class PoolConfig:
+    max_connections: int = field(default_factory=_env_int("OPENAI_POOL_SIZE", 100))
+    max_keepalive_connections: int = field(
+        default_factory=_env_int("OPENAI_POOL_KEEPALIVE", 20)
+    )
+    keepalive_expiry: float = 30.0
+    http2: bool = field(
+        default_factory=lambda: os.environ.get("OPENAI_HTTP2", "") in ("1", "true")
+    )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+@dataclass
+class PoolMetrics:
+    requests: int = 0
+    connections_opened: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def started(self) -> None:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def connected(self) -> None:
+        with self._lock:
+            self.connections_opened += 1
+
+
+def _started(*metrics: PoolMetrics) -> Callable[[], None]:
+    """Count a request on every `metrics`; returns the matching `finished`."""
+    for m in metrics:
+        m.started()
+
+    def finished() -> None:
+        for m in metrics:
+            m.finished()
+
+    return finished
+
+
+class _TrackedStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """A response body that reports when it is closed, i.e. the request is over."""
+
+    def __init__(self, stream, on_close: Callable[[], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        yield from self._stream
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    def _closed(self) -> None:
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            self._closed()
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._closed()
+
+
+class _CountingTransport(httpx.BaseTransport):
+    def __init__(self, config: PoolConfig, metrics: PoolMetrics) -> None:
+        self.transport = httpx.HTTPTransport(
+            limits=config.limits(), http2=config.http2
+        )
+        self.metrics = metrics
+        # this pool alone, for utilization against max_connections
+        self.pool_metrics = PoolMetrics()
+
+    def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.metrics.connected()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions.setdefault("trace", self._trace)
+        finished = _started(self.metrics, self.pool_metrics)
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException:
+            finished()
+            raise
+        response.stream = _TrackedStream(response.stream, finished)
+        return response
+
+    @property
+    def peak_in_flight(self) -> int:
+        return self.pool_metrics.peak_in_flight
+
+    def connections(self) -> list:
+        return list(self.transport._pool.connections)
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class _LoopTransport(httpx.AsyncBaseTransport):
+    """One async connection pool per event loop, all counted together."""
+
+    def __init__(self, config: PoolConfig, metrics: PoolMetrics) -> None:
+        self.config = config
+        self.metrics = metrics
+        # loop -> (its pool, that pool's own counts)
+        self._transports: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        # busiest single pool so far, including pools of loops that are gone
+        self._peak_in_flight = 0
+
+    def _transport(self) -> tuple[httpx.AsyncHTTPTransport, PoolMetrics]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._transports.get(loop)
+            if entry is None:
+                transport = httpx.AsyncHTTPTransport(
+                    limits=self.config.limits(), http2=self.config.http2
+                )
+                entry = self._transports[loop] = (transport, PoolMetrics())
+            return entry
+
+    @property
+    def peak_in_flight(self) -> int:
+        return self._peak_in_flight
+
+    def pool_count(self) -> int:
+        with self._lock:
+            return len(self._transports)
+
+    async def _trace(self, event: str, info: dict) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.metrics.connected()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions.setdefault("trace", self._trace)
+        transport, pool_metrics = self._transport()
+        finished = _started(self.metrics, pool_metrics)
+        self._peak_in_flight = max(self._peak_in_flight, pool_metrics.peak_in_flight)
+        try:
+            response = await transport.handle_async_request(request)
+        except BaseException:
+            finished()
+            raise
+        response.stream = _TrackedStream(response.stream, finished)
+        return response
+
+    def connections(self) -> list:
+        with self._lock:
+            transports = [t for t, _ in self._transports.values()]
+        return [conn for t in transports for conn in t._pool.connections]
+
+    async def aclose(self) -> None:
+        # only the running loop's pool can be closed from here
+        with self._lock:
+            entry = self._transports.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].aclose()
+
+
+class ClientPool:
+    def __init__(self, config: PoolConfig | None = None) -> None:
+        self.config = config or PoolConfig()
+        self.metrics = PoolMetrics()
+        self._sync_transport = _CountingTransport(self.config, self.metrics)
+        self._async_transport = _LoopTransport(self.config, self.metrics)
+        # per-request timeouts come from the OpenAI SDK
+        self.http_client = httpx.Client(
+            transport=self._sync_transport, follow_redirects=True
+        )
+        self.async_http_client = httpx.AsyncClient(
+            transport=self._async_transport, follow_redirects=True
+        )
+        self._llms: dict[tuple, OpenAI] = {}
+        self._embed_models: dict[tuple, OpenAIEmbedding] = {}
+        self._lock = threading.Lock()
+
+    def _clients(self) -> dict[str, Any]:
+        return {
+            "http_client": self.http_client,
+            "async_http_client": self.async_http_client,
+        }
+
+    def llm(self, model: str = DEFAULT_OPENAI_MODEL, **kwargs: Any) -> OpenAI:
+        key = (model, repr(sorted(kwargs.items())))
+        with self._lock:
+            if key not in self._llms:
+                self._llms[key] = OpenAI(model=model, **kwargs, **self._clients())
+            return self._llms[key]
+
+    def embed_model(
+        self, model_name: str = "text-embedding-3-small", **kwargs: Any
+    ) -> OpenAIEmbedding:
+        key = (model_name, repr(sorted(kwargs.items())))
+        with self._lock:
+            if key not in self._embed_models:
+                self._embed_models[key] = OpenAIEmbedding(
+                    model_name=model_name, **kwargs, **self._clients()
+                )
+            return self._embed_models[key]
+
+    def _warm_up_request(self, base_url: str | None) -> httpx.Request:
+        base_url = (
+            base_url
+            or os.environ.get("OPENAI_BASE_URL")
+            or os.environ.get("OPENAI_API_BASE", DEFAULT_API_BASE)
+        )
+        api_key = os.environ.get("OPENAI_API_KEY", "")
+        return httpx.Request(
+            "GET",
+            f"{base_url.rstrip('/')}/models",
+            headers={"Authorization": f"Bearer {api_key}"},
+            extensions={"timeout": httpx.Timeout(10.0).as_dict()},
+        )
+
+    async def awarm_up(
+        self, connections: int = 4, base_url: str | None = None
+    ) -> int:
+        """Open `connections` keep-alive connections in the running loop's pool.
+
+        Any response, even a 401, leaves a connection behind; returns how many
+        requests got one.
+        """
+
+        async def one() -> bool:
+            try:
+                request = self._warm_up_request(base_url)
+                response = await self.async_http_client.send(request)
+                await response.aclose()
+                return True
+            except httpx.HTTPError as e:
+                print(f"Warm-up request failed: {e!r}")
+                return False
+
+        connections = min(connections, self.config.max_keepalive_connections)
+        return sum(await asyncio.gather(*(one() for _ in range(connections))))
+
+    def warm_up(self, connections: int = 4, base_url: str | None = None) -> int:
+        """`awarm_up` for the sync client, used by blocking ingestion."""
+
+        def one(_) -> bool:
+            try:
+                response = self.http_client.send(self._warm_up_request(base_url))
+                response.close()
+                return True
+            except httpx.HTTPError as e:
+                print(f"Warm-up request failed: {e!r}")
+                return False
+
+        connections = min(connections, self.config.max_keepalive_connections)
+        with ThreadPoolExecutor(max_workers=connections) as executor:
+            return sum(executor.map(one, range(connections)))
+
+    def stats(self) -> dict[str, float]:
+        metrics = self.metrics
+        connections = (
+            self._sync_transport.connections() + self._async_transport.connections()
+        )
+        active = sum(1 for conn in connections if not conn.is_idle())
+        requests = metrics.requests
+        peak_pool = max(
+            self._sync_transport.peak_in_flight, self._async_transport.peak_in_flight
+        )
+        return {
+            "requests": requests,
+            "connections_opened": metrics.connections_opened,
+            "reuse_rate": (
+                1 - metrics.connections_opened / requests if requests else 0.0
+            ),
+            "open_connections": len(connections),
+            "active_connections": active,
+            "in_flight": metrics.in_flight,
+            "peak_in_flight": metrics.peak_in_flight,
+            # one sync pool plus one async pool per event loop not yet collected
+            "pools": 1 + self._async_transport.pool_count(),
+            "max_connections": self.config.max_connections,
+            "peak_pool_in_flight": peak_pool,
+            "peak_utilization": peak_pool / self.config.max_connections,
+        }
+
+
+_pool: ClientPool | None = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(**kwargs: Any) -> ClientPool:
+    """Set pool size, keep-alive or HTTP/2; only before the first client exists."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            raise RuntimeError("configure_pool() must run before any client is built")
+        _pool = ClientPool(PoolConfig(**kwargs))
+        return _pool
+
+
+def get_pool() -> ClientPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClientPool()
+        return _pool
+
+
+def get_llm(model: str = DEFAULT_OPENAI_MODEL, **kwargs: Any) -> OpenAI:
+    """Shared OpenAI LLM, one instance per model and settings."""
+    return get_pool().llm(model, **kwargs)
+
+
+def get_embed_model(
+    model_name: str = "text-embedding-3-small", **kwargs: Any
+) -> OpenAIEmbedding:
+    """Shared OpenAI embedding model, one instance per model and settings."""
+    return get_pool().embed_model(model_name, **kwargs)
+
+
+async def awarm_up(connections: int = 4, base_url: str | None = None) -> int:
+    return await get_pool().awarm_up(connections, base_url)
+
+
+def warm_up(connections: int = 4, base_url: str | None = None) -> int:
+    return get_pool().warm_up(connections, base_url)
+
+
+def pool_stats() -> dict[str, float]:
+    return get_pool().stats()
@@ -0,0 +1,189 @@
+"""
+Chat memory with cached token counts and rolling summarization.
+
+`ChatMemoryBuffer.get()` re-tokenizes the whole history on every call and drops
+whatever falls out of the window. `CompactChatMemory` counts each message once
+when it is added, keeps a running total and trims from the front, so `put` and
+`get` stay cheap as the session grows. Trimmed turns are folded into a rolling
+summary by a background task instead of being lost. The summary counts
+against `token_limit` too, so a growing summary pushes older turns out.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, Callable
+
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.llms.llm import LLM
+from llama_index.core.utils import get_tokenizer
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation below, building on the previous"
+    " summary. Keep names, numbers and decisions.\n\n"
+    "Previous summary:\n{summary}\n\n"
+    "New lines:\n{lines}\n\n"
+    "New summary:"
+)
+
+
+class CompactChatMemory:
+    def __init__(
+        self,
+        llm: LLM,
+        token_limit: int = 3000,
+        compact_after: int = 1000,
+        tokenizer_fn: Callable[[str], list] | None = None,
+    ) -> None:
+        self.llm = llm
+        self.token_limit = token_limit
+        self.compact_after = compact_after
+        self.tokenizer_fn = tokenizer_fn or get_tokenizer()
+        self._custom_tokenizer = tokenizer_fn is not None
+        self.summary = ""
+        self._summary_tokens = 0
+        self._messages: deque[tuple[ChatMessage, int]] = deque()
+        self._total_tokens = 0
+        self._pending: list[tuple[ChatMessage, int]] = []
+        self._pending_tokens = 0
+        self._compact_task: asyncio.Task | None = None
+        # bumped by reset(), so a compaction started before it is discarded
+        self._generation = 0
+
+    @classmethod
+    def from_defaults(
+        cls, llm: LLM, token_limit: int = 3000, **kwargs: Any
+    ) -> "CompactChatMemory":
+        return cls(llm=llm, token_limit=token_limit, **kwargs)
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens in the window plus the running summary."""
+        return self._total_tokens + self._summary_tokens
+
+    def _count(self, message: ChatMessage) -> int:
+        return len(self.tokenizer_fn(message.content or ""))
+
+    def put(self, message: ChatMessage) -> None:
+        count = self._count(message)
+        self._messages.append((message, count))
+        self._total_tokens += count
+        self._trim()
+        self._maybe_compact()
+
+    def _trim(self) -> None:
+        # each message is popped at most once, so this is O(1) amortized per put
+        while self.total_tokens > self.token_limit and len(self._messages) > 1:
+            self._evict()
+
+        # like ChatMemoryBuffer, never start the window with an assistant/tool turn
+        while len(self._messages) > 1 and self._messages[0][0].role in (
+            MessageRole.ASSISTANT,
+            MessageRole.TOOL,
+        ):
+            self._evict()
+
+    def _evict(self) -> None:
+        message, count = self._messages.popleft()
+        self._total_tokens -= count
+        self._pending.append((message, count))
+        self._pending_tokens += count
+
+    def get(self) -> list[ChatMessage]:
+        messages = [message for message, _ in self._messages]
+        if self.summary:
+            summary_msg = ChatMessage(
+                role=MessageRole.SYSTEM,
+                content=f"Summary of the earlier conversation:\n{self.summary}",
+            )
+            messages.insert(0, summary_msg)
+        return messages
+
+    def get_all(self) -> list[ChatMessage]:
+        return [message for message, _ in self._pending] + [
+            message for message, _ in self._messages
+        ]
+
+    def reset(self) -> None:
+        if self._compact_task is not None and not self._compact_task.done():
+            self._compact_task.cancel()
+        self._compact_task = None
+        self._generation += 1
+        self.summary = ""
+        self._summary_tokens = 0
+        self._messages.clear()
+        self._total_tokens = 0
+        self._pending.clear()
+        self._pending_tokens = 0
+
+    def _maybe_compact(self) -> None:
+        if self._pending_tokens < self.compact_after:
+            return
+        if self._compact_task is not None and not self._compact_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # no loop (sync usage), summarize on the next put inside one
+            return
+        # off the critical path: the current turn never waits for the summary
+        self._compact_task = loop.create_task(self.acompact())
+
+    async def acompact(self) -> None:
+        """Fold the evicted turns into the rolling summary."""
+        batch = list(self._pending)
+        if not batch:
+            return
+        generation = self._generation
+
+        lines = "\n".join(
+            f"{message.role.value}: {message.content}" for message, _ in batch
+        )
+        prompt = SUMMARY_PROMPT.format(summary=self.summary or "(none)", lines=lines)
+        try:
+            response = await self.llm.acomplete(prompt)
+        except Exception:
+            # keep the turns pending, the next compaction will retry them
+            return
+
+        if generation != self._generation:
+            # reset() ran while the LLM was busy; these turns are gone already
+            return
+        self.summary = str(response).strip()
+        self._summary_tokens = len(self.tokenizer_fn(self.summary))
+        del self._pending[: len(batch)]
+        self._pending_tokens = max(
+            0, self._pending_tokens - sum(count for _, count in batch)
+        )
+        self._trim()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the llm, default tokenizer and running task don't pickle; they are
+        # rebound on load. A custom tokenizer is kept, so it must be picklable
+        # (a module-level function, not a lambda or closure).
+        state = self.__dict__.copy()
+        state["llm"] = None
+        if not self._custom_tokenizer:
+            state["tokenizer_fn"] = None
+        state["_compact_task"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        # sessions saved before the summary was counted lack these
+        state.setdefault("_custom_tokenizer", False)
+        state.setdefault("_summary_tokens", 0)
+        state.setdefault("_generation", 0)
+        self.__dict__.update(state)
+        if not self._custom_tokenizer:
+            self.tokenizer_fn = get_tokenizer()
+        elif not callable(self.tokenizer_fn):
+            # the cached counts came from that tokenizer; mixing in another one
+            # would silently skew the window
+            raise ValueError(
+                "CompactChatMemory was saved with a custom tokenizer_fn that"
+                " could not be restored; use a module-level function"
+            )
+
+    async def aflush(self) -> None:
+        """Wait for any running compaction to finish."""
+        if self._compact_task is not None:
+            await self._compact_task
@@ -1,80 +1,52 @@
 import asyncio
+import random
 from workflows import Workflow, Context, step
-from workflows.events import Event, StartEvent, StopEvent
+from workflows.events import StartEvent, StopEvent
 
-
-class StepAEvent(Event):
-    query: str
-
-
-class StepBEvent(Event):
-    query: str
-
-
-class StepCEvent(Event):
-    query: str
-
-
-class StepACompleteEvent(Event):
-    result: str
-
-
-class StepBCompleteEvent(Event):
-    result: str
-
-
-class StepCCompleteEvent(Event):
-    result: str
+from fan_out import ItemDoneEvent, map_items
 
 
 class ConcurrentFlow(Workflow):
-    @step
-    async def start(
-        self, ctx: Context, ev: StartEvent
-    ) -> StepAEvent | StepBEvent | StepCEvent | None:
-        ctx.send_event(StepAEvent(query="Query 1"))
-        ctx.send_event(StepBEvent(query="Query 2"))
-        ctx.send_event(StepCEvent(query="Query 3"))
+    """Runs `process` over every query, `max_workers` at a time.
 
-    @step
-    async def step_a(self, ctx: Context, ev: StepAEvent) -> StepACompleteEvent:
-        print("Doing something A-ish")
-        return StepACompleteEvent(result=ev.query)
+    Start with `queries` (defaults to three), and optionally `max_workers` and
+    `item_timeout`. A query that fails or times out is reported in the result
+    instead of failing the run, under its position in `queries`.
+    """
 
     @step
-    async def step_b(self, ctx: Context, ev: StepBEvent) -> StepBCompleteEvent:
-        print("Doing something B-ish")
-        return StepBCompleteEvent(result=ev.query)
-
-    @step
-    async def step_c(self, ctx: Context, ev: StepCEvent) -> StepCCompleteEvent:
-        print("Doing something C-ish")
-        return StepCCompleteEvent(result=ev.query)
-
-    @step
-    async def step_three(
-        self,
-        ctx: Context,
-        ev: StepACompleteEvent | StepBCompleteEvent | StepCCompleteEvent,
-    ) -> StopEvent:
-        print("Received event ", ev.result)
-
-        # wait until we receive 3 events
-        if (
-            ctx.collect_events(
-                ev,
-                [StepCCompleteEvent, StepACompleteEvent, StepBCompleteEvent],
-            )
-            is None
-        ):
-            return None
+    async def start(self, ctx: Context, ev: StartEvent) -> StopEvent:
+        queries = ev.get("queries") or ["Query 1", "Query 2", "Query 3"]
+        results = await map_items(
+            ctx,
+            self.process,
+            queries,
+            max_workers=ev.get("max_workers") or 8,
+            timeout=ev.get("item_timeout"),
+        )
+
+        # do something with all the results together
+        return StopEvent(
+            result={
+                "results": [r.value for r in results if r.ok],
+                # by position: queries may repeat or be unhashable
+                "errors": {r.index: repr(r.error) for r in results if not r.ok},
+            }
+        )
+
+    async def process(self, query: str) -> str:
+        print(f"Doing something with {query}")
+        await asyncio.sleep(random.uniform(0, 0.1))
+        return query
 
-        # do something with all 3 results together
-        return StopEvent(result="Done")
 
 async def main():
     w = ConcurrentFlow(timeout=60, verbose=False)
-    result = await w.run()
+    handler = w.run(queries=[f"Query {i}" for i in range(10)], max_workers=3)
+    async for event in handler.stream_events():
+        if isinstance(event, ItemDoneEvent):
+            print(f"Received result {event.index + 1}/{event.total}: {event.value}")
+    result = await handler
     print(str(result))
 if __name__ == "__main__":
     import asyncio
@@ -0,0 +1,189 @@
+"""
+Disk-backed embedding cache shared by the RAG, router and Qdrant examples.
+
+`CachedEmbedding` wraps any embedding model. Vectors are stored as float32 blobs
+in SQLite, keyed by model name and a hash of the text, so a chunk or query is
+embedded once per model across workflows and restarts. The cache is bounded by
+`max_entries` and evicts the least recently used rows.
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding, Embedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr, SerializeAsAny
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / "output" / "embedding_cache.db"
+
+
+class CachedEmbedding(BaseEmbedding):
+    inner: SerializeAsAny[BaseEmbedding] = Field(description="Model to cache.")
+    cache_path: str = Field(default=str(DEFAULT_CACHE_PATH))
+    max_entries: int = Field(default=500_000)
+
+    _conn: sqlite3.Connection = PrivateAttr()
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _inserts_since_evict: int = PrivateAttr(default=0)
+
+    def __init__(self, inner: BaseEmbedding, **kwargs: Any) -> None:
+        kwargs.setdefault("model_name", inner.model_name)
+        kwargs.setdefault("embed_batch_size", inner.embed_batch_size)
+        super().__init__(inner=inner, **kwargs)
+        Path(self.cache_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key BLOB PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _key(self, kind: str, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode()).digest()
+
+    def _lookup(self, keys: list[bytes]) -> dict[bytes, Embedding]:
+        found: dict[bytes, Embedding] = {}
+        with self._lock:
+            # stay under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    "SELECT key, vector FROM embeddings"
+                    f" WHERE key IN ({placeholders})",
+                    chunk,
+                )
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in found],
+                    )
+        return found
+
+    def _store(self, items: list[tuple[bytes, Embedding]]) -> None:
+        now = time.time()
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes(), now)
+            for key, vector in items
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?)", rows
+            )
+            self._inserts_since_evict += len(rows)
+            # counting rows is not free, so only check the bound now and then
+            if self._inserts_since_evict >= 1000:
+                self._inserts_since_evict = 0
+                self._evict()
+
+    def _evict(self) -> None:
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN"
+                " (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def _split(
+        self, kind: str, texts: list[str]
+    ) -> tuple[list[bytes], dict[bytes, Embedding], list[int]]:
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup(keys)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        self._hits += len(texts) - len(missing)
+        self._misses += len(missing)
+        return keys, found, missing
+
+    def _merge(
+        self,
+        keys: list[bytes],
+        found: dict[bytes, Embedding],
+        missing: list[int],
+        computed: list[Embedding],
+    ) -> list[Embedding]:
+        new_items = [(keys[i], vector) for i, vector in zip(missing, computed)]
+        if new_items:
+            self._store(new_items)
+        found.update(new_items)
+        return [found[key] for key in keys]
+
+    def _get_query_embedding(self, query: str) -> Embedding:
+        keys, found, missing = self._split("query", [query])
+        computed = [self.inner.get_query_embedding(query)] if missing else []
+        return self._merge(keys, found, missing, computed)[0]
+
+    async def _aget_query_embedding(self, query: str) -> Embedding:
+        # SQLite calls block, so keep them off the event loop
+        keys, found, missing = await asyncio.to_thread(self._split, "query", [query])
+        computed = [await self.inner.aget_query_embedding(query)] if missing else []
+        merged = await asyncio.to_thread(self._merge, keys, found, missing, computed)
+        return merged[0]
+
+    def _get_text_embedding(self, text: str) -> Embedding:
+        return self._get_text_embeddings([text])[0]
+
+    async def _aget_text_embedding(self, text: str) -> Embedding:
+        return (await self._aget_text_embeddings([text]))[0]
+
+    def _get_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        keys, found, missing = self._split("text", texts)
+        computed = []
+        if missing:
+            computed = self.inner.get_text_embedding_batch([texts[i] for i in missing])
+        return self._merge(keys, found, missing, computed)
+
+    async def _aget_text_embeddings(self, texts: list[str]) -> list[Embedding]:
+        keys, found, missing = await asyncio.to_thread(self._split, "text", texts)
+        computed = []
+        if missing:
+            computed = await self.inner.aget_text_embedding_batch(
+                [texts[i] for i in missing]
+            )
+        return await asyncio.to_thread(self._merge, keys, found, missing, computed)
+
+    def stats(self) -> dict[str, Any]:
+        total = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / total if total else 0.0,
+        }
+
+
+_shared: dict[tuple, CachedEmbedding] = {}
+
+
+def get_cached_embed_model(
+    model_name: str = "text-embedding-3-small", **kwargs: Any
+) -> CachedEmbedding:
+    """Process-wide cached OpenAI embedding model, one instance per model name
+    and set of `CachedEmbedding` kwargs (e.g. `cache_path`, `max_entries`)."""
+    key = (model_name, *sorted(kwargs.items()))
+    if key not in _shared:
+        from client_pool import get_embed_model
+
+        _shared[key] = CachedEmbedding(get_embed_model(model_name), **kwargs)
+    return _shared[key]
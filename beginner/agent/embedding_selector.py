@@ -0,0 +1,134 @@
+"""
+Embedding-based selector for RouterQueryEngineWorkflow, with an LLM fallback.
+
+Each choice description is embedded once and kept; a query is scored against
+them with a single cosine per choice. Single mode picks the best choice, multi
+mode every choice at or above `threshold`. When no choice reaches `threshold`,
+or the decision is ambiguous (the top two are within `margin` in single mode, or
+any score sits within `margin` of `threshold` in multi mode), it escalates to
+the regular LLM selector.
+
+Good values depend on the embedding model and the tool descriptions, so the
+defaults are only a starting point: `selector_calibration.py` sweeps both
+against labelled questions for the router's tools and reports accuracy and how
+often each pair escalates.
+"""
+
+from typing import Sequence
+
+import numpy as np
+from llama_index.core.base.base_selector import (
+    BaseSelector,
+    SelectorResult,
+    SingleSelection,
+)
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.llms.llm import LLM
+from llama_index.core.prompts.mixin import PromptDictType
+from llama_index.core.schema import QueryBundle
+from llama_index.core.selectors.utils import get_selector_from_llm
+from llama_index.core.tools.types import ToolMetadata
+
+
+class EmbeddingSelector(BaseSelector):
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        llm: LLM | None = None,
+        is_multi: bool = False,
+        threshold: float = 0.3,
+        margin: float = 0.02,
+    ) -> None:
+        self.embed_model = embed_model
+        self.is_multi = is_multi
+        self.threshold = threshold
+        self.margin = margin
+        self.fallback = get_selector_from_llm(llm, is_multi=is_multi) if llm else None
+        self.escalations = 0
+        self._description_vectors: dict[str, np.ndarray] = {}
+
+    def _get_prompts(self) -> PromptDictType:
+        return {}
+
+    def _update_prompts(self, prompts: PromptDictType) -> None:
+        pass
+
+    def _missing(self, choices: Sequence[ToolMetadata]) -> list[str]:
+        descriptions = {c.description for c in choices}
+        return [d for d in descriptions if d not in self._description_vectors]
+
+    def _remember(self, descriptions: list[str], vectors: list[list[float]]) -> None:
+        for description, vector in zip(descriptions, vectors):
+            self._description_vectors[description] = _unit(vector)
+
+    def _matrix(self, choices: Sequence[ToolMetadata]) -> np.ndarray:
+        missing = self._missing(choices)
+        if missing:
+            self._remember(missing, self.embed_model.get_text_embedding_batch(missing))
+        return np.stack([self._description_vectors[c.description] for c in choices])
+
+    async def _amatrix(self, choices: Sequence[ToolMetadata]) -> np.ndarray:
+        missing = self._missing(choices)
+        if missing:
+            vectors = await self.embed_model.aget_text_embedding_batch(missing)
+            self._remember(missing, vectors)
+        return self._matrix(choices)
+
+    def _decide(self, scores: np.ndarray, margin: float) -> SelectorResult | None:
+        """Selections from the scores, or None when the LLM should decide."""
+        order = np.argsort(-scores)
+        if scores[order[0]] < self.threshold:
+            # nothing matches well; the best of several poor scores is noise
+            return None
+        if self.is_multi:
+            if np.any(np.abs(scores - self.threshold) < margin):
+                return None
+        elif len(order) > 1 and scores[order[0]] - scores[order[1]] < margin:
+            return None
+        return self._by_score(scores)
+
+    def _by_score(self, scores: np.ndarray) -> SelectorResult:
+        order = np.argsort(-scores)
+        chosen = [int(order[0])]
+        if self.is_multi:
+            above = [i for i in order.tolist() if scores[i] >= self.threshold]
+            chosen = above or chosen
+        return SelectorResult(
+            selections=[
+                SingleSelection(index=i, reason=f"embedding similarity {scores[i]:.3f}")
+                for i in chosen
+            ]
+        )
+
+    def _select(
+        self, choices: Sequence[ToolMetadata], query: QueryBundle
+    ) -> SelectorResult:
+        embedding = query.embedding or self.embed_model.get_query_embedding(
+            query.query_str
+        )
+        scores = self._matrix(choices) @ _unit(embedding)
+        result = self._decide(scores, self.margin)
+        if result is None and self.fallback is not None:
+            self.escalations += 1
+            return self.fallback.select(choices, query)
+        # without a fallback an ambiguous decision just follows the scores
+        return result or self._by_score(scores)
+
+    async def _aselect(
+        self, choices: Sequence[ToolMetadata], query: QueryBundle
+    ) -> SelectorResult:
+        embedding = query.embedding or await self.embed_model.aget_query_embedding(
+            query.query_str
+        )
+        scores = await self._amatrix(choices) @ _unit(embedding)
+        result = self._decide(scores, self.margin)
+        if result is None and self.fallback is not None:
+            self.escalations += 1
+            return await self.fallback.aselect(choices, query)
+        return result or self._by_score(scores)
+
+
+def _unit(vector: list[float]) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,95 @@
+"""
+Scripted stand-in LLM for load tests and benchmarks.
+
+Replies are taken from `script` and streamed word by word with an optional
+per-token delay, so agents can run without an API key. Chat calls pick the reply
+from the number of ReAct steps since the last user message, so concurrent
+sessions sharing one instance each see the script in order.
+"""
+
+import asyncio
+from typing import Any, Sequence
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    CompletionResponse,
+    CompletionResponseGen,
+    CustomLLM,
+    LLMMetadata,
+)
+
+DEFAULT_SCRIPT = [
+    'Thought: I need to use a tool.\nAction: add\nAction Input: {"x": 2, "y": 3}',
+    "Thought: I can answer without using any more tools.\nAnswer: The answer is 5.",
+]
+
+
+class ScriptedLLM(CustomLLM):
+    script: list[str] = Field(default_factory=lambda: list(DEFAULT_SCRIPT))
+    token_delay: float = Field(default=0.0, description="Seconds between tokens.")
+    first_token_delay: float = Field(default=0.0)
+
+    _turn: int = PrivateAttr(default=0)
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(model_name="scripted", is_chat_model=True)
+
+    def _next_reply(self) -> str:
+        reply = self.script[self._turn % len(self.script)]
+        self._turn += 1
+        return reply
+
+    @staticmethod
+    def _tokens(text: str) -> list[str]:
+        words = text.split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def _reply_for(self, messages: Sequence[ChatMessage]) -> str:
+        # count the trailing action/observation pairs of the current turn
+        steps = 0
+        for message in reversed(messages):
+            content = message.content or ""
+            if message.role != "assistant" and not content.startswith("Observation:"):
+                break
+            steps += 1
+        return self.script[min(steps // 2, len(self.script) - 1)]
+
+    def complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        return CompletionResponse(text=self._next_reply())
+
+    def stream_complete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponseGen:
+        text = ""
+        for token in self._tokens(self._next_reply()):
+            text += token
+            yield CompletionResponse(text=text, delta=token)
+
+    async def acomplete(
+        self, prompt: str, formatted: bool = False, **kwargs: Any
+    ) -> CompletionResponse:
+        await asyncio.sleep(self.first_token_delay)
+        return self.complete(prompt, formatted=formatted, **kwargs)
+
+    async def astream_chat(
+        self, messages: Sequence[ChatMessage], **kwargs: Any
+    ) -> ChatResponseAsyncGen:
+        reply = self._reply_for(messages)
+
+        async def gen() -> ChatResponseAsyncGen:
+            await asyncio.sleep(self.first_token_delay)
+            text = ""
+            for token in self._tokens(reply):
+                await asyncio.sleep(self.token_delay)
+                text += token
+                yield ChatResponse(
+                    message=ChatMessage(role="assistant", content=text), delta=token
+                )
+
+        return gen()
@@ -0,0 +1,473 @@
+"""
+Offline OpenAI-compatible server for running the workflows without the API.
+
+    python fake_openai_server.py --port 8765 --token-delay 0.02
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_BASE_URL=http://127.0.0.1:8765/v1 \\
+        OPENAI_API_KEY=offline python rag_workflow.py
+
+Serves /v1/chat/completions, /v1/responses and /v1/embeddings, streamed as SSE
+when `stream` is set. Replies are deterministic: a `--script` JSON list of
+{"match": regex, "reply": text} rules is tried first, then built-in rules that
+satisfy the prompts this repo sends (LLM rerank, selectors, ReAct), then filler
+text seeded by a hash of the prompt. When a request offers tools, the first tool
+is called with arguments generated from its JSON schema. Embeddings hash words
+into buckets (feature hashing), so they are deterministic and texts sharing words
+are similar. Latency (`--first-token-delay`, `--token-delay`), errors
+(`--error-rate`) and rate limits (`--rpm`, answered with 429) are configurable.
+
+LlamaIndex reads OPENAI_API_BASE and the OpenAI SDK reads OPENAI_BASE_URL, so
+set both.
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import numpy as np
+from aiohttp import web
+
+WORD = re.compile(r"\w+")
+FILLER = (
+    "the essay describes work on software painting startups writing and lisp "
+    "with early programs later companies and lessons about building things"
+).split()
+EMBED_DIMS = {"text-embedding-3-large": 3072}
+DEFAULT_EMBED_DIM = 1536
+
+BUILTIN_RULES = [
+    # LLMRerank / AsyncLLMReranker choice-select prompt
+    (re.compile(r"A list of documents is shown below"), "Doc: 1, Relevance: 8\n"),
+    # text (non function-calling) selectors
+    (
+        re.compile(r"return the (top )?choices? .*most relevant", re.S),
+        '[{"choice": 1, "reason": "offline stand-in"}]',
+    ),
+    # ReAct system header: answer straight away
+    (
+        re.compile(r"Action Input:"),
+        "Thought: I can answer without using any more tools.\nAnswer: {filler}",
+    ),
+]
+
+
+@dataclass
+class ServerConfig:
+    first_token_delay: float = 0.0
+    token_delay: float = 0.0
+    reply_words: int = 24
+    error_rate: float = 0.0
+    rpm: int | None = None
+    seed: int = 0
+    script: list[tuple[re.Pattern, str]] = field(default_factory=list)
+
+
+class RateLimiter:
+    """Token bucket refilled at `rpm` per minute, bursting up to `rpm`."""
+
+    def __init__(self, rpm: int) -> None:
+        self.capacity = rpm
+        self.tokens = float(rpm)
+        self.rate = rpm / 60.0
+        self.updated = time.monotonic()
+
+    def acquire(self) -> float:
+        """0 when admitted, else seconds until a request would be."""
+        now = time.monotonic()
+        refill = (now - self.updated) * self.rate
+        self.tokens = min(self.capacity, self.tokens + refill)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+
+
+def filler(prompt: str, words: int) -> str:
+    rng = random.Random(_seed(prompt))
+    return " ".join(rng.choice(FILLER) for _ in range(words)) + "."
+
+
+def embed(text: str, dim: int) -> np.ndarray:
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in WORD.findall(text.lower()):
+        h = _seed(word)
+        vector[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def example_for(schema: dict, defs: dict) -> object:
+    """A minimal valid instance of a JSON schema, for forced tool calls."""
+    if "$ref" in schema:
+        return example_for(defs[schema["$ref"].rsplit("/", 1)[-1]], defs)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            return example_for(schema[key][0], defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type", "object")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        required = schema.get("required", list(properties))
+        return {
+            name: example_for(properties[name], defs)
+            for name in required
+            if name in properties
+        }
+    if kind == "array":
+        return [example_for(schema.get("items", {}), defs)]
+    return {"integer": 1, "number": 1.0, "boolean": True}.get(kind, "offline")
+
+
+class FakeOpenAI:
+    def __init__(self, config: ServerConfig) -> None:
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.limiter = RateLimiter(config.rpm) if config.rpm else None
+        self.requests = 0
+
+    # -- helpers --------------------------------------------------------------
+
+    def reply_for(self, prompt: str) -> str:
+        for pattern, reply in self.config.script + BUILTIN_RULES:
+            if pattern.search(prompt):
+                return reply.replace(
+                    "{filler}", filler(prompt, self.config.reply_words)
+                )
+        return filler(prompt, self.config.reply_words)
+
+    def tokens(self, text: str) -> list[str]:
+        return re.findall(r"\S+\s*|\s+", text)
+
+    def injected_error(self) -> web.Response | None:
+        self.requests += 1
+        if self.limiter is not None:
+            wait = self.limiter.acquire()
+            if wait:
+                return web.json_response(
+                    {"error": {"message": "Rate limit reached", "type": "requests"}},
+                    status=429,
+                    headers={"retry-after": f"{wait:.3f}"},
+                )
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            return web.json_response(
+                {"error": {"message": "Injected failure", "type": "server_error"}},
+                status=500,
+            )
+        return None
+
+    async def sse(self, request: web.Request, payloads) -> web.StreamResponse:
+        response = web.StreamResponse(
+            headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"}
+        )
+        await response.prepare(request)
+        async for payload in payloads:
+            if isinstance(payload, tuple):
+                event, data = payload
+                await response.write(
+                    f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+                )
+            else:
+                await response.write(f"data: {payload}\n\n".encode())
+        await response.write_eof()
+        return response
+
+    async def paced(self, tokens: list[str]):
+        await asyncio.sleep(self.config.first_token_delay)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.config.token_delay)
+            yield token
+
+    # -- chat completions -----------------------------------------------------
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        error = self.injected_error()
+        if error is not None:
+            return error
+        body = await request.json()
+        model = body.get("model", "gpt-4o-mini")
+        prompt = "\n".join(
+            m["content"] if isinstance(m.get("content"), str)
+            else json.dumps(m.get("content"))
+            for m in body.get("messages", [])
+        )
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        tool_call = None
+        if body.get("tools"):
+            function = body["tools"][0]["function"]
+            parameters = function.get("parameters", {})
+            arguments = example_for(parameters, parameters.get("$defs", {}))
+            tool_call = {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {
+                    "name": function["name"],
+                    "arguments": json.dumps(arguments),
+                },
+            }
+        text = "" if tool_call else self.reply_for(prompt)
+        finish = "tool_calls" if tool_call else "stop"
+        usage = {
+            "prompt_tokens": len(prompt.split()),
+            "completion_tokens": len(text.split()),
+            "total_tokens": len(prompt.split()) + len(text.split()),
+        }
+
+        if not body.get("stream"):
+            await asyncio.sleep(
+                self.config.first_token_delay
+                + self.config.token_delay * max(0, len(self.tokens(text)) - 1)
+            )
+            message = {"role": "assistant", "content": text or None}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "message": message, "finish_reason": finish}
+                    ],
+                    "usage": usage,
+                }
+            )
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            return json.dumps(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+            )
+
+        async def payloads():
+            yield chunk({"role": "assistant", "content": ""})
+            if tool_call:
+                await asyncio.sleep(self.config.first_token_delay)
+                yield chunk({"tool_calls": [{"index": 0, **tool_call}]})
+            else:
+                async for token in self.paced(self.tokens(text)):
+                    yield chunk({"content": token})
+            yield chunk({}, finish)
+            yield "[DONE]"
+
+        return await self.sse(request, payloads())
+
+    # -- responses ------------------------------------------------------------
+
+    async def responses(self, request: web.Request) -> web.StreamResponse:
+        error = self.injected_error()
+        if error is not None:
+            return error
+        body = await request.json()
+        model = body.get("model", "gpt-4o-mini")
+        raw_input = body.get("input", "")
+        prompt = raw_input if isinstance(raw_input, str) else json.dumps(raw_input)
+        if body.get("instructions"):
+            prompt = f"{body['instructions']}\n{prompt}"
+        text = self.reply_for(prompt)
+        response_id = f"resp_{uuid.uuid4().hex[:24]}"
+        item_id = f"msg_{uuid.uuid4().hex[:24]}"
+
+        def response_object(status: str, output_text: str | None) -> dict:
+            output = []
+            if output_text is not None:
+                output = [
+                    {
+                        "id": item_id,
+                        "type": "message",
+                        "role": "assistant",
+                        "status": "completed",
+                        "content": [
+                            {"type": "output_text", "text": output_text,
+                             "annotations": []}
+                        ],
+                    }
+                ]
+            return {
+                "id": response_id,
+                "object": "response",
+                "created_at": int(time.time()),
+                "model": model,
+                "status": status,
+                "output": output,
+                "parallel_tool_calls": False,
+                "tool_choice": "auto",
+                "tools": [],
+                "usage": {
+                    "input_tokens": len(prompt.split()),
+                    "output_tokens": len(text.split()),
+                    "total_tokens": len(prompt.split()) + len(text.split()),
+                    "input_tokens_details": {"cached_tokens": 0},
+                    "output_tokens_details": {"reasoning_tokens": 0},
+                },
+            }
+
+        if not body.get("stream"):
+            await asyncio.sleep(
+                self.config.first_token_delay
+                + self.config.token_delay * max(0, len(self.tokens(text)) - 1)
+            )
+            return web.json_response(response_object("completed", text))
+
+        async def payloads():
+            sequence = 0
+
+            def event(kind: str, **data) -> tuple[str, dict]:
+                nonlocal sequence
+                sequence += 1
+                return kind, {"type": kind, "sequence_number": sequence, **data}
+
+            yield event(
+                "response.created", response=response_object("in_progress", None)
+            )
+            async for token in self.paced(self.tokens(text)):
+                yield event(
+                    "response.output_text.delta",
+                    item_id=item_id,
+                    output_index=0,
+                    content_index=0,
+                    delta=token,
+                    logprobs=[],
+                )
+            yield event(
+                "response.output_text.done",
+                item_id=item_id,
+                output_index=0,
+                content_index=0,
+                text=text,
+                logprobs=[],
+            )
+            yield event(
+                "response.completed", response=response_object("completed", text)
+            )
+
+        return await self.sse(request, payloads())
+
+    # -- embeddings -----------------------------------------------------------
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        error = self.injected_error()
+        if error is not None:
+            return error
+        body = await request.json()
+        model = body.get("model", "text-embedding-3-small")
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dim = body.get("dimensions") or EMBED_DIMS.get(model, DEFAULT_EMBED_DIM)
+        as_base64 = body.get("encoding_format") == "base64"
+
+        data = []
+        for index, item in enumerate(inputs):
+            text = item if isinstance(item, str) else " ".join(map(str, item))
+            vector = embed(text, dim)
+            encoded = (
+                base64.b64encode(vector.astype("<f4").tobytes()).decode()
+                if as_base64
+                else vector.tolist()
+            )
+            data.append({"object": "embedding", "index": index, "embedding": encoded})
+        await asyncio.sleep(self.config.first_token_delay)
+        tokens = sum(len(str(item).split()) for item in inputs)
+        return web.json_response(
+            {
+                "object": "list",
+                "data": data,
+                "model": model,
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            }
+        )
+
+    async def models(self, request: web.Request) -> web.Response:
+        return web.json_response({"object": "list", "data": []})
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/responses", self.responses)
+        app.router.add_post("/v1/embeddings", self.embeddings)
+        app.router.add_get("/v1/models", self.models)
+        return app
+
+
+def load_script(path: str | None) -> list[tuple[re.Pattern, str]]:
+    if not path:
+        return []
+    with open(path) as f:
+        rules = json.load(f)
+    return [(re.compile(rule["match"], re.S), rule["reply"]) for rule in rules]
+
+
+def start_in_thread(
+    config: ServerConfig, host: str = "127.0.0.1", port: int = 0
+) -> str:
+    """Run the server on a daemon thread; returns its base URL (ending in /v1)."""
+    ready = threading.Event()
+    address: list[str] = []
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(FakeOpenAI(config).app(), access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, host, port)
+        loop.run_until_complete(site.start())
+        bound_port = site._server.sockets[0].getsockname()[1]
+        address.append(f"http://{host}:{bound_port}/v1")
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True, name="fake-openai").start()
+    ready.wait()
+    return address[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.0)
+    parser.add_argument("--token-delay", type=float, default=0.0)
+    parser.add_argument("--reply-words", type=int, default=24)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--script", default=None, help="JSON list of match/reply")
+    args = parser.parse_args()
+
+    config = ServerConfig(
+        first_token_delay=args.first_token_delay,
+        token_delay=args.token_delay,
+        reply_words=args.reply_words,
+        error_rate=args.error_rate,
+        rpm=args.rpm,
+        seed=args.seed,
+        script=load_script(args.script),
+    )
+    web.run_app(FakeOpenAI(config).app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Deadline-aware fan-in of sub-engine queries for RouterQueryEngineWorkflow.
+
+`fan_in` starts every selected engine at once and hands each response to an
+`IncrementalCombiner` the moment it arrives. The combiner folds new answers into
+a running `TreeSummarize` summary (the first answer needs no LLM call), so
+combining overlaps with the engines that are still running. With `hedge_after`
+set, an engine that hasn't answered by then gets a duplicate request and the
+first of the two wins. When `deadline` passes, the stragglers are cancelled and
+the summary of whatever arrived is returned, marked `partial`. An answer the
+combiner fails to fold is left out the same way instead of failing the query.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from llama_index.core.base.response.schema import (
+    RESPONSE_TYPE,
+    AsyncStreamingResponse,
+    PydanticResponse,
+    Response,
+)
+from llama_index.core.response_synthesizers import TreeSummarize
+from llama_index.core.schema import NodeWithScore
+
+
+async def hedged(
+    call: Callable[[], Awaitable[RESPONSE_TYPE]], hedge_after: float | None
+) -> RESPONSE_TYPE:
+    """Run `call`; if it is still going after `hedge_after`, race a second one."""
+    first = asyncio.ensure_future(call())
+    if hedge_after is None:
+        return await first
+    pending = {first}
+    # from here on, being cancelled (e.g. at the deadline) cancels every attempt
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        pending.add(asyncio.ensure_future(call()))
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        # both attempts failed, surface the first error
+        return first.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class IncrementalCombiner:
+    def __init__(self, summarizer: TreeSummarize, query: str) -> None:
+        self.summarizer = summarizer
+        self.query = query
+        self.summary: str | None = None
+        self.source_nodes: list[NodeWithScore] = []
+        self.combined = 0
+        self._pending: list[RESPONSE_TYPE] = []
+        self._fold_task: asyncio.Task | None = None
+
+    def add(self, response: RESPONSE_TYPE) -> None:
+        self._pending.append(response)
+        if self._fold_task is None or self._fold_task.done():
+            self._fold_task = asyncio.create_task(self._fold())
+
+    async def _fold(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending, []
+            texts = []
+            nodes = []
+            for response in batch:
+                try:
+                    if isinstance(
+                        response, (AsyncStreamingResponse, PydanticResponse)
+                    ):
+                        response = await response.aget_response()
+                    texts.append(str(response))
+                except Exception as e:
+                    print(f"Skipping a sub-engine answer: {e!r}")
+                    continue
+                nodes.extend(response.source_nodes)
+            if not texts:
+                continue
+
+            inputs = ([self.summary] if self.summary is not None else []) + texts
+            if len(inputs) == 1:
+                summary = inputs[0]
+            else:
+                try:
+                    response = await self.summarizer.aget_response(self.query, inputs)
+                    summary = str(response)
+                except Exception as e:
+                    # keep the summary so far; these answers count as missing
+                    print(f"Combining failed, dropping {len(texts)} answers: {e!r}")
+                    continue
+            self.summary = summary
+            self.source_nodes.extend(nodes)
+            self.combined += len(texts)
+
+    async def wait(self, timeout: float | None) -> None:
+        """Wait for folds to catch up with everything added, up to `timeout`."""
+        while self._fold_task is not None and not self._fold_task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._fold_task), timeout)
+            except asyncio.TimeoutError:
+                return
+
+    def cancel(self) -> None:
+        """Stop a fold still running at the deadline; its inputs are left out."""
+        if self._fold_task is not None:
+            self._fold_task.cancel()
+
+    def response(self, expected: int) -> Response:
+        partial = self.combined < expected
+        if partial:
+            print(f"Answering from {self.combined}/{expected} sub-engines")
+        return Response(
+            response=self.summary or "No sub-engine answered before the deadline.",
+            source_nodes=self.source_nodes,
+            metadata={"partial": partial, "combined": self.combined},
+        )
+
+
+async def fan_in(
+    calls: list[Callable[[], Awaitable[RESPONSE_TYPE]]],
+    combiner: IncrementalCombiner,
+    deadline: float | None = None,
+    hedge_after: float | None = None,
+) -> Response:
+    start = time.monotonic()
+
+    def remaining() -> float | None:
+        if deadline is None:
+            return None
+        return max(0.0, deadline - (time.monotonic() - start))
+
+    pending = {asyncio.ensure_future(hedged(call, hedge_after)) for call in calls}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining(), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for task in done:
+                if task.exception() is not None:
+                    print(f"Sub-engine failed: {task.exception()!r}")
+                    continue
+                combiner.add(task.result())
+    finally:
+        for task in pending:
+            task.cancel()
+
+    await combiner.wait(remaining())
+    combiner.cancel()
+    return combiner.response(expected=len(calls))
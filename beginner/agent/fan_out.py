@@ -0,0 +1,139 @@
+"""
+Map one async function over N items with a bounded number of workers.
+
+`fan_out` is an async generator: `max_workers` tasks pull item indexes from a
+shared iterator, so at most that many calls are in flight, and each finished
+item is put on a queue and yielded as soon as it (or, with `ordered=True`,
+every item before it) is done. Collecting costs O(1) per arrival, unlike
+`ctx.collect_events`, which rescans the buffered events on every new one.
+
+A failing or timed-out item becomes an `ItemResult` with `error` set; it does
+not cancel the other items. `map_items` is the workflow-step version: it writes
+an `ItemDoneEvent` to the run's event stream for every item (partial results
+for whoever is streaming) and returns all results in input order.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+
+from workflows import Context
+from workflows.events import Event
+
+
+@dataclass
+class ItemResult:
+    index: int
+    item: Any
+    value: Any = None
+    error: BaseException | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class ItemDoneEvent(Event):
+    """Streamed once per finished item."""
+
+    index: int
+    total: int
+    value: Any = None
+    error: str | None = None
+
+
+async def fan_out(
+    fn: Callable[[Any], Awaitable[Any]],
+    items: Iterable[Any],
+    max_workers: int = 8,
+    timeout: float | None = None,
+    ordered: bool = False,
+) -> AsyncIterator[ItemResult]:
+    """Yield an `ItemResult` per item, in completion order or input order."""
+    if max_workers < 1:
+        # no worker would ever pull an item, so the caller would wait forever
+        raise ValueError("max_workers must be at least 1")
+    items = list(items)
+    done: asyncio.Queue[ItemResult] = asyncio.Queue()
+    indexes = iter(range(len(items)))
+
+    async def run(index: int) -> ItemResult:
+        item = items[index]
+        try:
+            value = await asyncio.wait_for(fn(item), timeout)
+            return ItemResult(index, item, value=value)
+        except asyncio.TimeoutError:
+            error = TimeoutError(f"item {index} took longer than {timeout}s")
+            return ItemResult(index, item, error=error)
+        except Exception as e:
+            return ItemResult(index, item, error=e)
+
+    async def worker() -> None:
+        # the iterator is shared, so each index is taken by exactly one worker
+        for index in indexes:
+            try:
+                result = await run(index)
+            except asyncio.CancelledError as e:
+                if asyncio.current_task().cancelling():
+                    raise  # fan_out is shutting the workers down
+                # a task inside `fn` was cancelled, not this worker
+                result = ItemResult(index, items[index], error=e)
+            except BaseException as e:
+                # still report the item, or the consumer would wait for it forever
+                done.put_nowait(ItemResult(index, items[index], error=e))
+                raise
+            done.put_nowait(result)
+
+    workers = [
+        asyncio.create_task(worker()) for _ in range(min(max_workers, len(items)))
+    ]
+    try:
+        # ordered: results that finished ahead of their turn, by index
+        waiting: dict[int, ItemResult] = {}
+        next_index = 0
+        for _ in range(len(items)):
+            result = await done.get()
+            if not ordered:
+                yield result
+                continue
+            waiting[result.index] = result
+            while next_index in waiting:
+                yield waiting.pop(next_index)
+                next_index += 1
+    finally:
+        # the consumer stopped early (or finished): don't leave calls running
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+async def map_items(
+    ctx: Context,
+    fn: Callable[[Any], Awaitable[Any]],
+    items: Iterable[Any],
+    max_workers: int = 8,
+    timeout: float | None = None,
+    ordered: bool = False,
+) -> list[ItemResult]:
+    """Run `fan_out` inside a step, streaming an `ItemDoneEvent` per item.
+
+    `ordered` only affects the order of the streamed events; the returned list
+    is always in input order.
+    """
+    items = list(items)
+    results: list[ItemResult | None] = [None] * len(items)
+    stream = fan_out(fn, items, max_workers, timeout, ordered)
+    try:
+        async for result in stream:
+            results[result.index] = result
+            ctx.write_event_to_stream(
+                ItemDoneEvent(
+                    index=result.index,
+                    total=len(items),
+                    value=result.value,
+                    error=None if result.ok else repr(result.error),
+                )
+            )
+    finally:
+        await stream.aclose()
+    return results
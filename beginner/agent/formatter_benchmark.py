@@ -0,0 +1,86 @@
+"""
+Compare ReActChatFormatter against IncrementalReActFormatter over a growing
+reasoning trace. Prints per-iteration formatting time and prompt size.
+"""
+
+import time
+
+from llama_index.core.agent.react import ReActChatFormatter
+from llama_index.core.agent.react.types import (
+    ActionReasoningStep,
+    ObservationReasoningStep,
+)
+from llama_index.core.llms import ChatMessage
+from llama_index.core.tools import FunctionTool
+
+from prompt_formatter import IncrementalReActFormatter
+
+
+def add(x: int, y: int) -> int:
+    """Useful function to add two numbers."""
+    return x + y
+
+
+def multiply(x: int, y: int) -> int:
+    """Useful function to multiply two numbers."""
+    return x * y
+
+
+def make_step(i: int):
+    if i % 2 == 0:
+        return ActionReasoningStep(
+            thought=f"I need to add {i} and {i + 1}.",
+            action="add",
+            action_input={"x": i, "y": i + 1},
+        )
+    return ObservationReasoningStep(observation=str(2 * i - 1))
+
+
+def prompt_bytes(messages: list[ChatMessage]) -> int:
+    return sum(len((message.content or "").encode()) for message in messages)
+
+
+def main(max_steps: int = 50, repeats: int = 20):
+    tools = [FunctionTool.from_defaults(add), FunctionTool.from_defaults(multiply)]
+    chat_history = [ChatMessage(role="user", content="what is 103223+320292")]
+    baseline = ReActChatFormatter.from_defaults()
+    incremental = IncrementalReActFormatter(baseline)
+
+    print(f"{'steps':>5} {'baseline_us':>12} {'incremental_us':>15} {'bytes':>8}")
+    baseline_total = 0.0
+    incremental_total = 0.0
+    current_reasoning = []
+    rendered_reasoning = []
+    for steps in range(1, max_steps + 1):
+        current_reasoning.append(make_step(steps))
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            expected = baseline.format(tools, chat_history, current_reasoning)
+        baseline_us = (time.perf_counter() - start) / repeats * 1e6
+
+        # the first call renders the new step, later repeats are pure cache hits,
+        # so time it the way the agent uses it: once per iteration
+        start = time.perf_counter()
+        actual = incremental.format(
+            tools, chat_history, current_reasoning, rendered_reasoning
+        )
+        incremental_us = (time.perf_counter() - start) * 1e6
+
+        assert [m.content for m in actual] == [m.content for m in expected]
+        baseline_total += baseline_us
+        incremental_total += incremental_us
+        print(
+            f"{steps:>5} {baseline_us:>12.1f} {incremental_us:>15.1f}"
+            f" {prompt_bytes(actual):>8}"
+        )
+
+    print(
+        f"\ncumulative formatting time over {max_steps} steps:"
+        f" baseline {baseline_total / 1000:.2f}ms,"
+        f" incremental {incremental_total / 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
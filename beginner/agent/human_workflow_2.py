@@ -6,6 +6,9 @@ from workflows.events import (
     HumanResponseEvent,
 )
 from workflows import Context
+from pathlib import Path
+
+from checkpoint_store import SqliteCheckpointStore
 
 
 class HumanInTheLoopWorkflow(Workflow):
@@ -21,18 +24,23 @@ class HumanInTheLoopWorkflow(Workflow):
 
 async def main():
     workflow = HumanInTheLoopWorkflow()
+    output_dir = Path(__file__).parent / "output"
+    output_dir.mkdir(exist_ok=True)
+    store = SqliteCheckpointStore(output_dir / "checkpoints.db")
+    run_id = "hitl-demo"
 
     handler = workflow.run()
     async for event in handler.stream_events():
         if isinstance(event, InputRequiredEvent):
-            # Serialize the context, store it anywhere as a JSON blob
-            ctx_dict = handler.ctx.to_dict()
+            # Checkpoint the context; only keys changed since the last save are written
+            await store.asave(run_id, handler.ctx.to_dict())
             await handler.cancel_run()
             break
 
     # now we handle the human response once it comes in
     response = input(event.question)
 
+    ctx_dict = await store.aload(run_id)
     restored_ctx = Context.from_dict(workflow, ctx_dict)
     handler = workflow.run(ctx=restored_ctx)
 
@@ -44,6 +52,7 @@ async def main():
         continue
 
     final_result = await handler
+    store.delete(run_id)
     print(final_result)
 
 
@@ -0,0 +1,234 @@
+"""
+Incremental, content-hashed ingestion into a persisted VectorStoreIndex.
+
+A manifest next to the persisted index records a hash per file and per chunk.
+On each sync only files whose bytes changed are read and re-chunked, only chunks
+whose text is new are embedded, and nodes of removed files (or removed chunks)
+are deleted. Chunks whose text survived keep their vector, but their docstore
+entry is rewritten so metadata and neighbour links match the new parse. The
+index is loaded from disk instead of rebuilt on restart.
+
+Chunking a large batch of changed files is spread over the process pool (see
+`parse_nodes`), with the document texts passed through shared memory.
+"""
+
+import hashlib
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from llama_index.core import (
+    Document,
+    SimpleDirectoryReader,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.node_parser import NodeParser, SentenceSplitter
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import BasePydanticVectorStore
+
+from process_pool import cpu_bound, process_workers, should_offload
+
+MANIFEST_NAME = "ingest_manifest.json"
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def parser_config(node_parser: NodeParser) -> dict:
+    """Fields to rebuild `node_parser` in a worker; parsers themselves don't pickle."""
+    config = node_parser.model_dump(exclude={"callback_manager", "id_func"})
+    config.pop("class_name", None)
+    return config
+
+
+@cpu_bound
+def split_documents(
+    parser_cls: type[NodeParser],
+    parser_config: dict,
+    documents: list[Document],
+    texts: list[str],
+) -> list[BaseNode]:
+    """Chunk `documents` (emptied for transport) in a worker, restoring `texts`."""
+    for document, text in zip(documents, texts):
+        document.set_content(text)
+    return parser_cls(**parser_config).get_nodes_from_documents(documents)
+
+
+def parse_nodes(
+    node_parser: NodeParser,
+    documents: list[Document],
+    pool: ProcessPoolExecutor | None = None,
+    batches: int | None = None,
+) -> list[BaseNode]:
+    """`node_parser.get_nodes_from_documents`, across processes when it pays off.
+
+    Documents are split into `batches` batches (default: one per worker of the
+    shared pool); their texts go through shared memory and the rest (ids,
+    metadata) is pickled. Workers rebuild the parser from its fields, so a
+    custom tokenizer or id function isn't carried over. An explicit `pool` is
+    always used.
+    """
+    chars = sum(len(document.text) for document in documents)
+    if pool is None and (len(documents) < 2 or not should_offload(chars)):
+        return node_parser.get_nodes_from_documents(documents)
+
+    config = parser_config(node_parser)
+    batch_size = -(-len(documents) // (batches or process_workers()))
+    calls = []
+    for start in range(0, len(documents), batch_size):
+        batch = documents[start : start + batch_size]
+        shells = []
+        for document in batch:
+            shell = document.model_copy()
+            shell.set_content("")
+            shells.append(shell)
+        texts = [document.text for document in batch]
+        calls.append((type(node_parser), config, shells, texts))
+    return [node for nodes in split_documents.map(calls, pool) for node in nodes]
+
+
+class IncrementalIngestor:
+    def __init__(
+        self,
+        persist_dir: str | Path,
+        embed_model: BaseEmbedding,
+        node_parser: NodeParser | None = None,
+        vector_store_loader: Callable[[str], BasePydanticVectorStore] | None = None,
+    ) -> None:
+        self.persist_dir = Path(persist_dir)
+        self.embed_model = embed_model
+        self.node_parser = node_parser or SentenceSplitter()
+        # opens (or creates) a custom vector store for persist_dir, e.g. MmapVectorStore
+        self.vector_store_loader = vector_store_loader
+        self.manifest_path = self.persist_dir / MANIFEST_NAME
+        self.index: VectorStoreIndex | None = None
+        # {file path: {"hash": file hash, "nodes": {node id: chunk hash}}}
+        self.manifest: dict[str, dict] = {}
+
+    def load(self) -> VectorStoreIndex:
+        if self.index is not None:
+            return self.index
+        vector_store = None
+        if self.vector_store_loader is not None:
+            vector_store = self.vector_store_loader(str(self.persist_dir))
+
+        if self.manifest_path.exists():
+            storage_context = StorageContext.from_defaults(
+                persist_dir=str(self.persist_dir), vector_store=vector_store
+            )
+            self.index = load_index_from_storage(
+                storage_context, embed_model=self.embed_model
+            )
+            self.manifest = json.loads(self.manifest_path.read_text())
+        else:
+            storage_context = StorageContext.from_defaults(vector_store=vector_store)
+            self.index = VectorStoreIndex(
+                nodes=[], storage_context=storage_context, embed_model=self.embed_model
+            )
+            self.manifest = {}
+        return self.index
+
+    @property
+    def version(self) -> str:
+        """Changes whenever a sync changes the indexed content; stable across runs."""
+        files = sorted((path, entry["hash"]) for path, entry in self.manifest.items())
+        return _sha256(json.dumps(files).encode())[:16]
+
+    def sync(self, dirname: str | Path) -> tuple[VectorStoreIndex, dict[str, int]]:
+        """Bring the index in line with `dirname`; returns the index and counts."""
+        index = self.load()
+        stats = Counter()
+
+        input_files = SimpleDirectoryReader(str(dirname), recursive=True).input_files
+        current = {str(path): _sha256(Path(path).read_bytes()) for path in input_files}
+
+        for path in self.manifest.keys() - current.keys():
+            index.delete_nodes(
+                list(self.manifest.pop(path)["nodes"]), delete_from_docstore=True
+            )
+            stats["removed_files"] += 1
+
+        changed = [
+            path
+            for path, file_hash in current.items()
+            if self.manifest.get(path, {}).get("hash") != file_hash
+        ]
+        stats["unchanged_files"] = len(current) - len(changed)
+        documents = {
+            # path-based document ids, so reused chunks keep a valid ref_doc_id
+            path: SimpleDirectoryReader(
+                input_files=[path], filename_as_id=True
+            ).load_data()
+            for path in changed
+        }
+        # chunk every changed file in one go, so large syncs can use all cores
+        path_of = {doc.id_: path for path, docs in documents.items() for doc in docs}
+        new_nodes: dict[str, list[BaseNode]] = {path: [] for path in changed}
+        all_documents = [doc for docs in documents.values() for doc in docs]
+        for node in parse_nodes(self.node_parser, all_documents):
+            new_nodes[path_of[node.ref_doc_id]].append(node)
+        for path in changed:
+            self._sync_file(path, current[path], new_nodes[path], stats)
+
+        if changed or stats["removed_files"]:
+            self.persist()
+        return index, dict(stats)
+
+    def _sync_file(
+        self, path: str, file_hash: str, new_nodes: list[BaseNode], stats: Counter
+    ) -> None:
+        old_nodes: dict[str, str] = self.manifest.get(path, {}).get("nodes", {})
+
+        # reuse node ids for chunks whose text hasn't changed
+        reusable: dict[str, list[str]] = {}
+        for node_id, chunk_hash in old_nodes.items():
+            reusable.setdefault(chunk_hash, []).append(node_id)
+
+        kept: dict[str, str] = {}
+        renamed: dict[str, str] = {}
+        to_embed, reused = [], []
+        for position, node in enumerate(new_nodes):
+            chunk_hash = _sha256(node.get_content().encode())
+            if reusable.get(chunk_hash):
+                node_id = reusable[chunk_hash].pop()
+                reused.append(node)
+            else:
+                node_id = _sha256(f"{path}:{position}:{chunk_hash}".encode())[:32]
+                to_embed.append(node)
+            renamed[node.id_] = node_id
+            node.id_ = node_id
+            kept[node_id] = chunk_hash
+        # prev/next links still name the ids the parser made up
+        for node in new_nodes:
+            for info in node.relationships.values():
+                for related in info if isinstance(info, list) else [info]:
+                    related.node_id = renamed.get(related.node_id, related.node_id)
+
+        stale = [node_id for node_id in old_nodes if node_id not in kept]
+        if stale:
+            self.index.delete_nodes(stale, delete_from_docstore=True)
+        if reused:
+            # same text, so the vector stands; replace the stored node, whose
+            # metadata, ref_doc_id and neighbours came from the previous parse
+            docstore = self.index.docstore
+            for node in reused:
+                docstore.delete_document(node.node_id, raise_error=False)
+            docstore.add_documents(reused, allow_update=True)
+        if to_embed:
+            self.index.insert_nodes(to_embed)
+
+        stats["deleted_chunks"] += len(stale)
+        stats["embedded_chunks"] += len(to_embed)
+        stats["reused_chunks"] += len(new_nodes) - len(to_embed)
+        self.manifest[path] = {"hash": file_hash, "nodes": kept}
+
+    def persist(self) -> None:
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        self.index.storage_context.persist(persist_dir=str(self.persist_dir))
+        self.manifest_path.write_text(json.dumps(self.manifest))
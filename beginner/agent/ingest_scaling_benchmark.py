@@ -0,0 +1,170 @@
+"""
+Multi-core scaling of ingestion: chunking and BM25 builds in the process pool.
+
+    python ingest_scaling_benchmark.py --mb 16 --workers 1 2 4 8
+
+Builds a synthetic corpus of `--documents` documents (paragraphs of the Paul
+Graham essay, shuffled) and times `parse_nodes` inline and with a process pool
+of each size in `--workers`. Pools are started and warmed before timing, so the
+numbers are steady-state throughput; startup is reported separately. Chunks are
+checked to be identical to the inline ones. Then a 5 ms ticker measures how
+late the event loop runs while ingestion happens in a thread (`to_thread`,
+still holding the GIL) versus in the pool (`.aio`).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from llama_index.core import Document
+from llama_index.core.node_parser import SentenceSplitter
+
+from bm25_index import BM25Index, build_bm25
+from incremental_ingest import parse_nodes, parser_config, split_documents
+
+ESSAY = Path(__file__).parent / "data" / "paul_graham" / "paul_graham_essay.txt"
+
+
+def synthetic_corpus(
+    megabytes: float, documents: int, seed: int = 0
+) -> list[Document]:
+    paragraphs = [p for p in ESSAY.read_text().split("\n\n") if p.strip()]
+    rng = random.Random(seed)
+    per_document = int(megabytes * 1_000_000 / documents)
+    corpus = []
+    for i in range(documents):
+        parts, size = [], 0
+        while size < per_document:
+            paragraph = rng.choice(paragraphs)
+            parts.append(paragraph)
+            size += len(paragraph) + 2
+        corpus.append(Document(text="\n\n".join(parts), id_=f"doc-{i}"))
+    return corpus
+
+
+def start_pool(workers: int) -> tuple[ProcessPoolExecutor, float]:
+    start = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+    # one task per worker, each slow enough that every worker gets one
+    list(pool.map(time.sleep, [0.2] * workers))
+    return pool, time.perf_counter() - start
+
+
+def timed(fn, repeats: int) -> float:
+    runs = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - start)
+    return min(runs)
+
+
+async def loop_lag(work) -> dict[str, float]:
+    """Lateness of a 5 ms ticker while `work` (a coroutine) runs."""
+    lags = []
+    done = False
+
+    async def ticker():
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - start - 0.005)
+
+    task = asyncio.create_task(ticker())
+    await work
+    done = True
+    await task
+    return {
+        "max_ms": max(lags) * 1000,
+        "p99_ms": sorted(lags)[int(0.99 * (len(lags) - 1))] * 1000,
+        "mean_ms": statistics.mean(lags) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mb", type=float, default=8.0, help="corpus size")
+    parser.add_argument("--documents", type=int, default=64)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4, os.cpu_count() or 1]
+    )
+    parser.add_argument("--repeats", type=int, default=2)
+    parser.add_argument("--out", default=None, help="write JSON results here")
+    args = parser.parse_args()
+
+    node_parser = SentenceSplitter()
+    corpus = synthetic_corpus(args.mb, args.documents)
+    chars = sum(len(document.text) for document in corpus)
+    print(f"corpus: {len(corpus)} documents, {chars / 1e6:.1f}M chars")
+    print(f"cores: {os.cpu_count()}")
+
+    inline_nodes = node_parser.get_nodes_from_documents(corpus)
+    expected = [node.get_content() for node in inline_nodes]
+    inline_s = timed(
+        lambda: node_parser.get_nodes_from_documents(corpus), args.repeats
+    )
+    ids = [node.node_id for node in inline_nodes]
+    texts = [node.get_content() for node in inline_nodes]
+    bm25_s = timed(lambda: BM25Index.from_texts(ids, texts), args.repeats)
+    print(f"{'inline':<12}{'chunk':>10}{inline_s:>9.2f}s  1.00x")
+
+    rows = {"inline": {"chunk_s": inline_s, "bm25_s": bm25_s}}
+    for workers in sorted(set(args.workers)):
+        pool, startup_s = start_pool(workers)
+        with pool:
+            nodes = parse_nodes(node_parser, corpus, pool=pool, batches=workers)
+            assert [node.get_content() for node in nodes] == expected
+            chunk_s = timed(
+                lambda: parse_nodes(node_parser, corpus, pool=pool, batches=workers), 1
+            )
+            pool_bm25_s = timed(lambda: build_bm25.map([(ids, texts)], pool), 1)
+        rows[f"{workers} workers"] = {
+            "chunk_s": chunk_s,
+            "bm25_s": pool_bm25_s,
+            "speedup": inline_s / chunk_s,
+            "startup_s": startup_s,
+        }
+        print(
+            f"{f'{workers} workers':<12}{'chunk':>10}{chunk_s:>9.2f}s"
+            f"  {inline_s / chunk_s:.2f}x  (startup {startup_s:.2f}s)"
+        )
+    print(f"bm25 build: inline {bm25_s:.2f}s, in a worker {pool_bm25_s:.2f}s")
+
+    async def lag_runs() -> dict[str, dict[str, float]]:
+        thread = await loop_lag(
+            asyncio.to_thread(node_parser.get_nodes_from_documents, corpus)
+        )
+        shells = [Document(text="", id_=document.id_) for document in corpus]
+        config = parser_config(node_parser)
+        # start the shared pool's worker before measuring
+        await split_documents.aio(SentenceSplitter, config, [], [])
+        process = await loop_lag(
+            split_documents.aio(
+                SentenceSplitter, config, shells, [d.text for d in corpus]
+            )
+        )
+        return {"to_thread": thread, "process_pool": process}
+
+    rows["loop_lag"] = asyncio.run(lag_runs())
+    for name, lag in rows["loop_lag"].items():
+        print(
+            f"loop lag with {name}: max {lag['max_ms']:.1f}ms"
+            f" p99 {lag['p99_ms']:.1f}ms mean {lag['mean_ms']:.2f}ms"
+        )
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        result = {"config": vars(args), "chars": chars, "results": rows}
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
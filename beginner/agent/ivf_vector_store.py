@@ -0,0 +1,219 @@
+"""
+IVF (inverted file) approximate nearest-neighbour index on NumPy.
+
+Extends MmapVectorStore with a spherical k-means coarse quantizer: every vector
+is filed under its nearest of `nlist` centroids, and a query only scores the
+rows of its `nprobe` nearest lists. Below `train_threshold` vectors the index is
+untrained and falls back to exact search. Inserts go straight into their list;
+deletes are tombstones, dropped on persist. `nprobe` trades recall for speed and
+can be changed per store at any time.
+
+The default `nprobe=32` is sized for the self-chosen nlist (4 * sqrt(n)). With
+`ann_benchmark.py` (dim 256), recall@10 and QPS vs exact search were:
+
+    n        nprobe 8       nprobe 16      nprobe 32      exact
+    10k      0.54 / 3550    0.84 / 2700    0.96 / 1504    1.00 / 1271
+    100k     0.68 / 1429    0.88 / 1083    0.96 / 592     1.00 / 77
+
+Raise it toward 64 (0.99) when recall matters more than throughput.
+"""
+
+import math
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import VectorStoreQueryResult
+
+from mmap_vector_store import (
+    PERSIST_NAME,
+    QUANTIZED_BLOCK,
+    MmapVectorStore,
+    _normalize,
+    top_k,
+)
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, n_clusters: int, n_iter: int = 10, seed: int = 0
+) -> np.ndarray:
+    """Unit-norm centroids for unit-norm `vectors`."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = assign_to_centroids(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        counts = np.bincount(assign, minlength=n_clusters)
+        empty = counts == 0
+        # re-seed empty clusters with random points so nlist stays useful
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids.astype(np.float32)
+
+
+def assign_to_centroids(
+    vectors: np.ndarray, centroids: np.ndarray, block: int = 16_384
+) -> np.ndarray:
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block):
+        chunk = np.asarray(vectors[start : start + block], dtype=np.float32)
+        assign[start : start + block] = np.argmax(chunk @ centroids.T, axis=1)
+    return assign
+
+
+class IVFVectorStore(MmapVectorStore):
+    nlist: int | None = None
+    nprobe: int = 32
+    train_threshold: int = 10_000
+    max_train_points: int = 256 * 1024
+
+    _centroids: np.ndarray | None = PrivateAttr(default=None)
+    _assign: np.ndarray = PrivateAttr(
+        default_factory=lambda: np.zeros(0, dtype=np.int32)
+    )
+    _lists: list[list[int]] = PrivateAttr(default_factory=list)
+    _list_arrays: dict[int, np.ndarray] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "IVFVectorStore"
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    def _dense(self, start: int, end: int) -> np.ndarray:
+        return self._gather(slice(start, end))
+
+    def _gather(self, rows: np.ndarray | slice) -> np.ndarray:
+        """Rows as float32 unit vectors, dequantized if needed."""
+        vectors = np.asarray(self._matrix[rows], dtype=np.float32)
+        if self.quantize:
+            vectors = _normalize(vectors * self._scales[rows][:, None])
+        return vectors
+
+    def train(self, nlist: int | None = None) -> None:
+        """(Re)build the centroids from the live vectors and refile every row."""
+        live = np.flatnonzero(self._alive[: self._size])
+        if len(live) == 0:
+            return
+        nlist = nlist or self.nlist or max(1, int(4 * math.sqrt(len(live))))
+        nlist = min(nlist, len(live))
+
+        sample = live
+        if len(sample) > self.max_train_points:
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(live, self.max_train_points, replace=False))
+
+        self._centroids = spherical_kmeans(self._gather(sample), nlist)
+        self._assign = np.full(len(self._alive), -1, dtype=np.int32)
+        for start in range(0, self._size, QUANTIZED_BLOCK):
+            end = min(start + QUANTIZED_BLOCK, self._size)
+            self._assign[start:end] = assign_to_centroids(
+                self._dense(start, end), self._centroids
+            )
+        self._rebuild_lists()
+
+    def _rebuild_lists(self) -> None:
+        self._lists = [[] for _ in range(len(self._centroids))]
+        order = np.argsort(self._assign[: self._size], kind="stable")
+        bounds = np.searchsorted(
+            self._assign[: self._size][order], np.arange(len(self._centroids) + 1)
+        )
+        for list_id in range(len(self._centroids)):
+            start, end = bounds[list_id], bounds[list_id + 1]
+            self._lists[list_id] = order[start:end].tolist()
+        self._list_arrays = {}
+
+    def add(self, nodes: list[BaseNode], **add_kwargs: Any) -> list[str]:
+        start = self._size
+        ids = super().add(nodes, **add_kwargs)
+        end = self._size
+        if not self.is_trained:
+            if self.num_vectors >= self.train_threshold:
+                self.train()
+            return ids
+
+        if len(self._assign) < len(self._alive):
+            grown = np.full(len(self._alive), -1, dtype=np.int32)
+            grown[: len(self._assign)] = self._assign
+            self._assign = grown
+        new_assign = assign_to_centroids(self._dense(start, end), self._centroids)
+        self._assign[start:end] = new_assign
+        for row, list_id in zip(range(start, end), new_assign.tolist()):
+            self._lists[list_id].append(row)
+            self._list_arrays.pop(list_id, None)
+        return ids
+
+    def _list_rows(self, list_id: int) -> np.ndarray:
+        rows = self._list_arrays.get(list_id)
+        if rows is None:
+            rows = self._list_arrays[list_id] = np.asarray(
+                self._lists[list_id], dtype=np.int64
+            )
+        return rows
+
+    def search(
+        self, query: np.ndarray, k: int, nprobe: int | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k rows and scores for one unit query vector."""
+        probes = min(nprobe or self.nprobe, len(self._centroids))
+        best_lists, _ = top_k(query @ self._centroids.T, probes)
+        candidates = np.concatenate([self._list_rows(c) for c in best_lists.tolist()])
+        candidates = candidates[self._alive[candidates]]
+        if len(candidates) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        vectors = np.asarray(self._matrix[candidates], dtype=np.float32)
+        scores = vectors @ query
+        if self.quantize:
+            scores *= self._scales[candidates]
+        idx, best = top_k(scores, k)
+        return candidates[idx], best
+
+    def query_batch(
+        self,
+        embeddings: list[list[float]] | np.ndarray,
+        k: int,
+        nprobe: int | None = None,
+    ) -> list[VectorStoreQueryResult]:
+        if not self.is_trained:
+            return super().query_batch(embeddings, k)
+
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        results = []
+        for query in queries:
+            rows, scores = self.search(query, k, nprobe)
+            results.append(
+                VectorStoreQueryResult(
+                    ids=[self._ids[row] for row in rows.tolist()],
+                    similarities=scores.tolist(),
+                )
+            )
+        return results
+
+    def persist(self, persist_path: str, fs: Any | None = None) -> None:
+        super().persist(persist_path, fs=fs)
+        if not self.is_trained:
+            return
+        base = Path(persist_path)
+        base = base.parent / PERSIST_NAME if base.suffix else base / PERSIST_NAME
+        live = np.flatnonzero(self._alive[: self._size])
+        np.save(f"{base}.centroids.npy", self._centroids)
+        np.save(f"{base}.assign.npy", self._assign[live])
+
+    @classmethod
+    def from_persist_dir(
+        cls, persist_dir: str, quantize: bool = False, **kwargs: Any
+    ) -> "IVFVectorStore":
+        store = super().from_persist_dir(persist_dir, quantize=quantize, **kwargs)
+        base = Path(persist_dir) / PERSIST_NAME
+        centroids_path = Path(f"{base}.centroids.npy")
+        if centroids_path.exists() and store._size:
+            store._centroids = np.load(centroids_path)
+            store._assign = np.load(f"{base}.assign.npy")
+            store._rebuild_lists()
+        return store
@@ -0,0 +1,266 @@
+"""
+Local vector store backed by a memory-mapped NumPy matrix.
+
+Vectors are L2-normalized on insert and kept in one float32 matrix (or int8 with
+a per-row scale when `quantize=True`). A query is a single matrix-vector product
+plus `argpartition`, and `query_batch` scores many queries with one matrix
+product. On disk the matrix is a plain `.npy` file opened with `mmap_mode="r"`,
+so loading a large store is close to instant and pages are read on demand.
+
+Text lives in the index docstore (`stores_text = False`), like SimpleVectorStore.
+"""
+
+import json
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from llama_index.core.bridge.pydantic import PrivateAttr
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    MetadataFilters,
+    VectorStoreQuery,
+    VectorStoreQueryResult,
+)
+
+PERSIST_NAME = "default__vector_store"
+QUANTIZED_BLOCK = 65_536
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _quantize(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(matrix / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Indices and scores of the k best entries along the last axis, sorted."""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        empty = np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+        return empty, empty.astype(np.float32)
+    idx = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    part = np.take_along_axis(scores, idx, axis=-1)
+    order = np.argsort(-part, axis=-1)
+    return np.take_along_axis(idx, order, axis=-1), np.take_along_axis(
+        part, order, axis=-1
+    )
+
+
+class MmapVectorStore(BasePydanticVectorStore):
+    stores_text: bool = False
+    is_embedding_query: bool = True
+    quantize: bool = False
+
+    _matrix: np.ndarray | None = PrivateAttr(default=None)
+    _scales: np.ndarray | None = PrivateAttr(default=None)
+    _size: int = PrivateAttr(default=0)
+    _alive: np.ndarray = PrivateAttr(default_factory=lambda: np.zeros(0, dtype=bool))
+    _ids: list[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: list[str | None] = PrivateAttr(default_factory=list)
+    _row_by_id: dict[str, int] = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MmapVectorStore"
+
+    @property
+    def client(self) -> None:
+        return None
+
+    @property
+    def num_vectors(self) -> int:
+        # not __len__: an empty store would be falsy and StorageContext.from_defaults
+        # would silently swap it for a SimpleVectorStore
+        return len(self._row_by_id)
+
+    # -- writes ---------------------------------------------------------------
+
+    def _reserve(self, extra: int, dim: int) -> None:
+        """Grow the in-memory buffers geometrically; copies a read-only mmap once."""
+        needed = self._size + extra
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        writeable = self._matrix is not None and self._matrix.flags.writeable
+        if writeable and needed <= capacity:
+            return
+
+        new_capacity = max(needed, capacity * 2, 1024)
+        dtype = np.int8 if self.quantize else np.float32
+        matrix = np.zeros((new_capacity, dim), dtype=dtype)
+        scales = np.ones(new_capacity, dtype=np.float32)
+        alive = np.zeros(new_capacity, dtype=bool)
+        if self._matrix is not None:
+            matrix[: self._size] = self._matrix[: self._size]
+            alive[: self._size] = self._alive[: self._size]
+            if self._scales is not None:
+                scales[: self._size] = self._scales[: self._size]
+        self._matrix = matrix
+        self._scales = scales if self.quantize else None
+        self._alive = alive
+
+    def add(self, nodes: list[BaseNode], **add_kwargs: Any) -> list[str]:
+        if not nodes:
+            return []
+        vectors = _normalize(
+            np.asarray([node.get_embedding() for node in nodes], dtype=np.float32)
+        )
+        self._reserve(len(nodes), vectors.shape[1])
+
+        start, end = self._size, self._size + len(nodes)
+        if self.quantize:
+            codes, scales = _quantize(vectors)
+            self._matrix[start:end] = codes
+            self._scales[start:end] = scales
+        else:
+            self._matrix[start:end] = vectors
+        self._alive[start:end] = True
+
+        for row, node in enumerate(nodes, start=start):
+            previous = self._row_by_id.get(node.node_id)
+            if previous is not None:
+                self._alive[previous] = False
+            self._row_by_id[node.node_id] = row
+            self._ids.append(node.node_id)
+            self._ref_doc_ids.append(node.ref_doc_id)
+        self._size = end
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        for row, doc_id in enumerate(self._ref_doc_ids):
+            if doc_id == ref_doc_id and self._alive[row]:
+                self._drop_row(row)
+
+    def delete_nodes(
+        self,
+        node_ids: list[str] | None = None,
+        filters: MetadataFilters | None = None,
+        **delete_kwargs: Any,
+    ) -> None:
+        if filters is not None:
+            raise NotImplementedError("MmapVectorStore does not store metadata")
+        for node_id in node_ids or []:
+            row = self._row_by_id.get(node_id)
+            if row is not None:
+                self._drop_row(row)
+
+    def _drop_row(self, row: int) -> None:
+        self._alive[row] = False
+        self._row_by_id.pop(self._ids[row], None)
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._scales = None
+        self._size = 0
+        self._alive = np.zeros(0, dtype=bool)
+        self._ids = []
+        self._ref_doc_ids = []
+        self._row_by_id = {}
+
+    # -- reads ----------------------------------------------------------------
+
+    def _scores(self, queries: np.ndarray) -> np.ndarray:
+        """Cosine scores of (B, D) unit queries against every row, dead rows at -inf."""
+        if self._size == 0:
+            return np.empty((queries.shape[0], 0), dtype=np.float32)
+        matrix = self._matrix[: self._size]
+        if self.quantize:
+            # dequantize block by block so we never hold a float copy of everything
+            scores = np.empty((queries.shape[0], self._size), dtype=np.float32)
+            for start in range(0, self._size, QUANTIZED_BLOCK):
+                end = min(start + QUANTIZED_BLOCK, self._size)
+                block = matrix[start:end].astype(np.float32)
+                scores[:, start:end] = (queries @ block.T) * self._scales[start:end]
+        else:
+            scores = queries @ matrix.T
+        scores[:, ~self._alive[: self._size]] = -np.inf
+        return scores
+
+    def query_batch(
+        self, embeddings: list[list[float]] | np.ndarray, k: int
+    ) -> list[VectorStoreQueryResult]:
+        queries = _normalize(np.asarray(embeddings, dtype=np.float32))
+        rows, scores = top_k(self._scores(queries), min(k, self.num_vectors))
+        return [
+            VectorStoreQueryResult(
+                ids=[self._ids[row] for row in row_idx],
+                similarities=score_row.tolist(),
+            )
+            for row_idx, score_row in zip(rows, scores)
+        ]
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("MmapVectorStore does not support filters")
+        if query.query_embedding is None:
+            raise ValueError("MmapVectorStore needs a query embedding")
+
+        if query.node_ids:
+            # restrict to the given nodes by scoring only their rows
+            rows = [self._row_by_id[n] for n in query.node_ids if n in self._row_by_id]
+            scores = self._scores(
+                _normalize(np.asarray([query.query_embedding], dtype=np.float32))
+            )[0]
+            subset = np.full_like(scores, -np.inf)
+            subset[rows] = scores[rows]
+            idx, best = top_k(subset[None, :], min(query.similarity_top_k, len(rows)))
+            return VectorStoreQueryResult(
+                ids=[self._ids[row] for row in idx[0]], similarities=best[0].tolist()
+            )
+
+        return self.query_batch([query.query_embedding], query.similarity_top_k)[0]
+
+    # -- persistence ----------------------------------------------------------
+
+    def persist(self, persist_path: str, fs: Any | None = None) -> None:
+        """Write the live rows, compacting away deleted ones."""
+        base = Path(persist_path)
+        base = base.parent / PERSIST_NAME if base.suffix else base / PERSIST_NAME
+        base.parent.mkdir(parents=True, exist_ok=True)
+
+        live = np.flatnonzero(self._alive[: self._size])
+        if self._matrix is None:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        else:
+            matrix = np.ascontiguousarray(self._matrix[live])
+        np.save(f"{base}.npy", matrix)
+        if self.quantize:
+            np.save(f"{base}.scales.npy", self._scales[live])
+
+        meta = {
+            "quantize": self.quantize,
+            "ids": [self._ids[row] for row in live],
+            "ref_doc_ids": [self._ref_doc_ids[row] for row in live],
+        }
+        Path(f"{base}.json").write_text(json.dumps(meta))
+
+    @classmethod
+    def from_persist_dir(
+        cls, persist_dir: str, quantize: bool = False, **kwargs: Any
+    ) -> "MmapVectorStore":
+        """Open a persisted store with its matrix memory-mapped, or a new one."""
+        base = Path(persist_dir) / PERSIST_NAME
+        meta_path = Path(f"{base}.json")
+        if not meta_path.exists():
+            return cls(quantize=quantize, **kwargs)
+
+        meta = json.loads(meta_path.read_text())
+        store = cls(quantize=meta["quantize"], **kwargs)
+        matrix = np.load(f"{base}.npy", mmap_mode="r")
+        store._size = len(meta["ids"])
+        if store._size:
+            store._matrix = matrix
+            if store.quantize:
+                store._scales = np.load(f"{base}.scales.npy", mmap_mode="r")
+        store._alive = np.ones(store._size, dtype=bool)
+        store._ids = meta["ids"]
+        store._ref_doc_ids = meta["ref_doc_ids"]
+        store._row_by_id = {node_id: row for row, node_id in enumerate(store._ids)}
+        return store
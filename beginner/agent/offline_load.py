@@ -0,0 +1,229 @@
+"""
+Repeatable load test of the workflows against the offline OpenAI stand-in.
+
+    python offline_load.py --requests 50 --concurrency 8 --token-delay 0.01
+    python offline_load.py --workflows rag router --error-rate 0.05 --rpm 600
+
+Starts fake_openai_server on a free port, points LlamaIndex and the OpenAI SDK
+at it and drives JokeFlow, ReActAgent, RAGWorkflow and RouterQueryEngineWorkflow
+with the real OpenAI clients, so HTTP, SSE parsing, retries and backoff are all
+exercised without an API key or network. Indexes and the embedding cache go to
+a temporary directory, never to output/, so fake vectors can't leak into the
+real caches. The semantic response cache is off unless `--response-cache`.
+Reports p50/p95/p99 latency and errors per workflow plus connection pool stats,
+optionally as JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from fake_openai_server import ServerConfig, load_script, start_in_thread
+
+DATA_DIR = Path(__file__).parent / "data" / "paul_graham"
+WORKFLOWS = ("joke", "react", "rag", "router")
+QUESTIONS = (
+    "What did the author work on before college?",
+    "How did Viaweb start?",
+    "What did the author learn from painting?",
+    "Why did the author leave Y Combinator?",
+)
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def setup(names: list[str], workdir: Path, response_cache: bool) -> dict:
+    """One coroutine factory per workflow, taking the request number."""
+    # imported after the environment points at the stand-in: some clients are
+    # built at import time
+    from embedding_cache import get_cached_embed_model
+    from semantic_cache import SemanticResponseCache
+
+    embed_model = get_cached_embed_model(
+        "text-embedding-3-small", cache_path=str(workdir / "embedding_cache.db")
+    )
+    cache = SemanticResponseCache(
+        embed_model, max_entries=1000 if response_cache else 0
+    )
+    runners = {}
+
+    if "joke" in names:
+        from simple_workflow import JokeFlow
+
+        async def joke(i: int) -> None:
+            await JokeFlow(timeout=60).run(topic=f"topic {i}")
+
+        runners["joke"] = joke
+
+    if "react" in names:
+        from llama_index.core.tools import FunctionTool
+        from client_pool import get_llm
+        from react_workflow import ReActAgent
+
+        def add(x: int, y: int) -> int:
+            """Useful function to add two numbers."""
+            return x + y
+
+        agent = ReActAgent(
+            llm=get_llm("gpt-4o"),
+            tools=[FunctionTool.from_defaults(add)],
+            timeout=120,
+            verbose=False,
+        )
+
+        async def react(i: int) -> None:
+            await agent.run(input=f"what is {i}+{i}?")
+
+        runners["react"] = react
+
+    if "rag" in names:
+        from rag_workflow import RAGWorkflow
+
+        rag = RAGWorkflow(timeout=120, response_cache=cache)
+        index = await rag.run(
+            dirname=str(DATA_DIR), persist_dir=str(workdir / "rag_storage")
+        )
+
+        async def rag_query(i: int) -> None:
+            question = QUESTIONS[i % len(QUESTIONS)]
+            result = await rag.run(query=f"{question} ({i})", index=index)
+            async for _ in result.async_response_gen():
+                pass
+
+        runners["rag"] = rag_query
+
+    if "router" in names:
+        from llama_index.core import Settings
+        from router_indexes import RouterIndexes, build_query_engine_tools
+        from router_workflow import (
+            RouterQueryEngineWorkflow,
+            build_summarizer,
+            configure_settings,
+        )
+
+        configure_settings(embed_model=embed_model)
+        indexes = RouterIndexes(DATA_DIR, workdir / "router_storage")
+        tools = build_query_engine_tools(indexes)
+        router = RouterQueryEngineWorkflow(timeout=200, response_cache=cache)
+        summarizer = build_summarizer(Settings.llm)
+
+        async def route(i: int) -> None:
+            question = QUESTIONS[i % len(QUESTIONS)]
+            result = await router.run(
+                query=f"{question} ({i})",
+                llm=Settings.llm,
+                query_engine_tools=tools,
+                indexes=indexes,
+                summarizer=summarizer,
+                select_multi=True,
+            )
+            if hasattr(result, "async_response_gen"):
+                async for _ in result.async_response_gen():
+                    pass
+
+        runners["router"] = route
+
+    return runners
+
+
+async def drive(runner, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await runner(i)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                return
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        **{f"p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workflows", nargs="+", choices=WORKFLOWS, default=WORKFLOWS)
+    parser.add_argument("--requests", type=int, default=20, help="per workflow")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--token-delay", type=float, default=0.005)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--script", default=None, help="JSON list of match/reply")
+    parser.add_argument("--response-cache", action="store_true")
+    parser.add_argument("--warm-up", type=int, default=0, help="connections")
+    parser.add_argument("--out", default=None, help="write JSON results here")
+    args = parser.parse_args()
+
+    base_url = start_in_thread(
+        ServerConfig(
+            first_token_delay=args.first_token_delay,
+            token_delay=args.token_delay,
+            error_rate=args.error_rate,
+            rpm=args.rpm,
+            seed=args.seed,
+            script=load_script(args.script),
+        )
+    )
+    os.environ["OPENAI_API_BASE"] = os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "offline"
+    print(f"fake OpenAI server at {base_url}")
+
+    from client_pool import awarm_up, pool_stats
+
+    if args.warm_up:
+        print(f"warmed up {await awarm_up(args.warm_up)} connections")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        runners = await setup(args.workflows, Path(workdir), args.response_cache)
+        for name, runner in runners.items():
+            results[name] = await drive(runner, args.requests, args.concurrency)
+            row = results[name]
+            latency = " ".join(
+                f"p{q}={row[f'p{q}'] * 1000:.0f}ms"
+                for q in (50, 95, 99)
+                if row[f"p{q}"] is not None
+            )
+            print(
+                f"{name:<8} {row['requests']} requests, {row['errors']} errors,"
+                f" {row['throughput_rps']:.1f} req/s  {latency}"
+            )
+            if row["first_error"]:
+                print(f"         first error: {row['first_error']}")
+
+    results["pool"] = pool_stats()
+    print(f"pool: {results['pool']}")
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        result = {"config": vars(args), **results}
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
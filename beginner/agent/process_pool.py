@@ -0,0 +1,238 @@
+"""
+Process-pool execution for CPU-bound work in workflow steps.
+
+Every step runs on the workflow's event loop, and `asyncio.to_thread` only moves
+blocking work off the loop: pure-Python CPU work (chunking, tokenizing) still
+holds the GIL, so it runs on one core and slows every other run on the loop.
+Module-level functions marked `@cpu_bound` still work as plain calls and gain
+`.aio(...)`, to await from a step, and `.map(calls)`, for blocking code that is
+already off the loop; both run the function in a shared process pool.
+
+Large arguments and results go through shared memory instead of the pickle
+stream: numpy arrays and lists of strings of at least `SHARED_MIN_BYTES` are
+copied once into a `SharedMemory` block, and only its name crosses the pipe.
+Workers are started with "spawn", so they never inherit the parent's threads or
+open connections. CPU_POOL_WORKERS sets the pool size (default: all cores).
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+SHARED_MIN_BYTES = 1 << 20
+# below this much text, starting workers and shipping data costs more than it saves
+PARALLEL_MIN_CHARS = 1_000_000
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def process_workers() -> int:
+    return int(os.environ.get("CPU_POOL_WORKERS", os.cpu_count() or 1))
+
+
+def should_offload(chars: int) -> bool:
+    """Whether work over `chars` of text is worth sending to the pool."""
+    return process_workers() > 1 and chars >= PARALLEL_MIN_CHARS
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=process_workers(), mp_context=get_context("spawn")
+            )
+        return _pool
+
+
+# -- shared memory ------------------------------------------------------------
+
+
+@dataclass
+class SharedArray:
+    name: str
+    shape: tuple[int, ...]
+    dtype: str
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> tuple["SharedArray", SharedMemory]:
+        array = np.ascontiguousarray(array)
+        shm = SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+        return cls(shm.name, array.shape, array.dtype.str), shm
+
+    def load(self) -> np.ndarray:
+        shm = SharedMemory(name=self.name)
+        try:
+            view = np.ndarray(self.shape, self.dtype, buffer=shm.buf)
+            array = view.copy()
+            del view
+            return array
+        finally:
+            shm.close()
+
+
+@dataclass
+class SharedTexts:
+    """A list of strings stored as end offsets followed by one UTF-8 buffer."""
+
+    name: str
+    count: int
+    size: int
+
+    @classmethod
+    def create(cls, texts: list[str]) -> tuple["SharedTexts", SharedMemory]:
+        encoded = [text.encode() for text in texts]
+        ends = np.cumsum([len(data) for data in encoded], dtype=np.int64)
+        header = ends.nbytes
+        size = header + (int(ends[-1]) if len(ends) else 0)
+        shm = SharedMemory(create=True, size=max(1, size))
+        shm.buf[:header] = ends.tobytes()
+        shm.buf[header:size] = b"".join(encoded)
+        return cls(shm.name, len(texts), size), shm
+
+    def load(self) -> list[str]:
+        shm = SharedMemory(name=self.name)
+        try:
+            header = 8 * self.count
+            ends = np.frombuffer(shm.buf[:header], dtype=np.int64).tolist()
+            data = bytes(shm.buf[header : self.size])
+        finally:
+            shm.close()
+        starts = [0, *ends[:-1]]
+        return [data[s:e].decode() for s, e in zip(starts, ends)]
+
+
+def _share(value: Any, blocks: list[SharedMemory]) -> Any:
+    """Swap a large array or list of strings for a shared-memory handle."""
+    if isinstance(value, np.ndarray) and value.nbytes >= SHARED_MIN_BYTES:
+        handle, shm = SharedArray.create(value)
+    elif (
+        isinstance(value, (list, tuple))
+        and value
+        and all(isinstance(text, str) for text in value)
+        and sum(len(text) for text in value) >= SHARED_MIN_BYTES
+    ):
+        handle, shm = SharedTexts.create(list(value))
+    else:
+        return value
+    blocks.append(shm)
+    return handle
+
+
+def _unshare(value: Any) -> Any:
+    if isinstance(value, (SharedArray, SharedTexts)):
+        return value.load()
+    return value
+
+
+def _release(blocks: list[SharedMemory]) -> None:
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
+
+
+# -- calls --------------------------------------------------------------------
+
+
+def _call(fn: Callable, args: tuple, kwargs: dict) -> tuple[Any, bool]:
+    """Runs in the worker: rebuild shared arguments, call, share the result."""
+    args = tuple(_unshare(arg) for arg in args)
+    kwargs = {key: _unshare(value) for key, value in kwargs.items()}
+    result = fn(*args, **kwargs)
+    blocks: list[SharedMemory] = []
+    shared = _share(result, blocks)
+    # spawned workers share the parent's resource tracker, which forgets the
+    # block when the parent unlinks it after reading
+    for shm in blocks:
+        shm.close()
+    return shared, bool(blocks)
+
+
+def _collect(outcome: tuple[Any, bool]) -> Any:
+    result, shared = outcome
+    if not shared:
+        return result
+    try:
+        return result.load()
+    finally:
+        shm = SharedMemory(name=result.name)
+        shm.close()
+        shm.unlink()
+
+
+def _collect_all(futures: list[Future]) -> tuple[list[Any], Exception | None]:
+    """Collect every future, past any failure, so no result block is left behind."""
+    results: list[Any] = []
+    error: Exception | None = None
+    for future in futures:
+        try:
+            results.append(_collect(future.result()))
+        except Exception as exc:
+            error = error or exc
+    return results, error
+
+
+def _prepare(args: tuple, kwargs: dict) -> tuple[tuple, dict, list[SharedMemory]]:
+    blocks: list[SharedMemory] = []
+    args = tuple(_share(arg, blocks) for arg in args)
+    kwargs = {key: _share(value, blocks) for key, value in kwargs.items()}
+    return args, kwargs, blocks
+
+
+async def run_in_process(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Await `fn(*args, **kwargs)` run in the process pool."""
+    args, kwargs, blocks = _prepare(args, kwargs)
+    try:
+        future = get_process_pool().submit(_call, fn, args, kwargs)
+        return _collect(await asyncio.wrap_future(future))
+    finally:
+        _release(blocks)
+
+
+def process_map(
+    fn: Callable, calls: Iterable[tuple], pool: Executor | None = None
+) -> list[Any]:
+    """Run `fn(*args)` for every args tuple in `calls`; results in call order."""
+    pool = pool or get_process_pool()
+    blocks: list[SharedMemory] = []
+    futures: list[Future] = []
+    try:
+        for args in calls:
+            args, kwargs, call_blocks = _prepare(tuple(args), {})
+            blocks.extend(call_blocks)
+            futures.append(pool.submit(_call, fn, args, kwargs))
+    finally:
+        # wait for everything submitted, even if a submit failed, and unlink
+        # every result block before anything is raised
+        results, error = _collect_all(futures)
+        _release(blocks)
+    if error is not None:
+        raise error
+    return results
+
+
+def cpu_bound(fn: Callable) -> Callable:
+    """Mark a module-level function as runnable in the process pool.
+
+    The function itself is returned (so workers can unpickle it by name), with
+    `fn.aio(*args)` and `fn.map(calls, pool=None)` attached.
+    """
+
+    async def aio(*args: Any, **kwargs: Any) -> Any:
+        return await run_in_process(fn, *args, **kwargs)
+
+    def map_(calls: Iterable[tuple], pool: Executor | None = None) -> list[Any]:
+        return process_map(fn, calls, pool)
+
+    fn.aio = aio
+    fn.map = map_
+    return fn
@@ -0,0 +1,71 @@
+"""
+Incremental ReAct prompt formatting.
+
+`ReActChatFormatter.format` re-renders the system header, every tool description
+and the whole reasoning trace on each loop iteration. This formatter renders the
+header once per tool set and only appends messages for reasoning steps that are
+new since the last call. The output is a byte-stable prefix that only grows,
+which is what provider-side prompt caching needs to hit.
+"""
+
+from typing import Sequence
+
+from llama_index.core.agent.react import ReActChatFormatter
+from llama_index.core.agent.react.formatter import get_react_tool_descriptions
+from llama_index.core.agent.react.types import (
+    BaseReasoningStep,
+    ObservationReasoningStep,
+)
+from llama_index.core.llms import ChatMessage, MessageRole
+from llama_index.core.tools.types import BaseTool
+
+
+class IncrementalReActFormatter:
+    def __init__(self, formatter: ReActChatFormatter) -> None:
+        self.formatter = formatter
+        self._header_key: tuple[str, ...] | None = None
+        self._header: ChatMessage | None = None
+
+    @classmethod
+    def from_defaults(cls, context: str = "") -> "IncrementalReActFormatter":
+        return cls(ReActChatFormatter.from_defaults(context=context))
+
+    def header(self, tools: Sequence[BaseTool]) -> ChatMessage:
+        """Render the system header once and reuse it while the tools don't change."""
+        key = tuple(tool.metadata.get_name() for tool in tools)
+        if self._header is None or key != self._header_key:
+            format_args = {
+                "tool_desc": "\n".join(get_react_tool_descriptions(tools)),
+                "tool_names": ", ".join(key),
+            }
+            if self.formatter.context:
+                format_args["context"] = self.formatter.context
+            content = self.formatter.system_header.format(**format_args)
+            self._header = ChatMessage(role=MessageRole.SYSTEM, content=content)
+            self._header_key = key
+        return self._header
+
+    def render_step(self, reasoning_step: BaseReasoningStep) -> ChatMessage:
+        if isinstance(reasoning_step, ObservationReasoningStep):
+            role = self.formatter.observation_role
+        else:
+            role = MessageRole.ASSISTANT
+        return ChatMessage(role=role, content=reasoning_step.get_content())
+
+    def format(
+        self,
+        tools: Sequence[BaseTool],
+        chat_history: list[ChatMessage],
+        current_reasoning: list[BaseReasoningStep],
+        rendered_reasoning: list[ChatMessage],
+    ) -> list[ChatMessage]:
+        """
+        Same output as `ReActChatFormatter.format`.
+
+        `rendered_reasoning` holds the messages already rendered for this run and
+        is extended in place with the steps that are new.
+        """
+        for reasoning_step in current_reasoning[len(rendered_reasoning) :]:
+            rendered_reasoning.append(self.render_step(reasoning_step))
+
+        return [self.header(tools), *chat_history, *rendered_reasoning]
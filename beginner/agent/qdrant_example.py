@@ -8,10 +8,12 @@ from IPython.display import Markdown, display
 from llama_index.core import VectorStoreIndex, SimpleDirectoryReader
 from llama_index.core import StorageContext
 from llama_index.vector_stores.qdrant import QdrantVectorStore
-from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core import Settings
 
-Settings.embed_model = OpenAIEmbedding(model_name="text-embedding-3-small")
+from embedding_cache import get_cached_embed_model
+
+# shared on-disk cache, chunks already embedded by other workflows are reused
+Settings.embed_model = get_cached_embed_model("text-embedding-3-small")
 Settings.chunk_size = 1024
 Settings.chunk_overlap = 128
 
@@ -1,9 +1,15 @@
+import asyncio
+import time
+from contextlib import aclosing
 from pathlib import Path
+from typing import Any
+
+import numpy as np
 from llama_index.core.workflow import Event
-from llama_index.core.schema import NodeWithScore
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.base.response.schema import AsyncStreamingResponse
 from llama_index.core import SimpleDirectoryReader, VectorStoreIndex
 from llama_index.core.response_synthesizers import CompactAndRefine
-from llama_index.core.postprocessor.llm_rerank import LLMRerank
 from llama_index.core.workflow import (
     Context,
     Workflow,
@@ -12,17 +18,22 @@ from llama_index.core.workflow import (
     step,
 )
 
-from llama_index.llms.openai import OpenAI
 from llama_index.embeddings.openai import OpenAIEmbedding
 from llama_index.core.node_parser import SentenceSplitter
 from llama_index.core import VectorStoreIndex, StorageContext
 from llama_index.core import Settings
 
-from llama_index.core import set_global_handler
+from client_pool import get_llm
+from embedding_cache import get_cached_embed_model
+from incremental_ingest import IncrementalIngestor
+from ivf_vector_store import IVFVectorStore
+from mmap_vector_store import MmapVectorStore
+from reranker import AsyncLLMReranker, LocalReranker
+from semantic_cache import SemanticResponseCache, record_stream
+from tracing import configure_tracing
 
-# Enable Phoenix tracing - will connect to Phoenix at localhost:6006
-set_global_handler("arize_phoenix")
-print("Connected to Phoenix at http://localhost:6006")
+DEFAULT_PERSIST_DIR = Path(__file__).parent / "output" / "rag_storage"
+VECTOR_STORES = {"mmap": MmapVectorStore, "ivf": IVFVectorStore}
 
 
 class RetrieverEvent(Event):
@@ -38,70 +49,182 @@ class RerankEvent(Event):
 
 
 class RAGWorkflow(Workflow):
+    def __init__(
+        self,
+        *args: Any,
+        reranker: AsyncLLMReranker | LocalReranker | None = None,
+        response_cache: SemanticResponseCache | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._ingestors: dict[str, IncrementalIngestor] = {}
+        # index id -> ingestor version, so cached answers never outlive the index
+        self._index_versions: dict[str, str] = {}
+        # built once; pass LocalReranker() to rerank without any LLM call
+        self.reranker = reranker or AsyncLLMReranker(
+            llm=get_llm("gpt-4o-mini"), top_n=3, choice_batch_size=5
+        )
+        self.response_cache = response_cache or SemanticResponseCache(
+            get_cached_embed_model("text-embedding-3-small")
+        )
+        self.summarizer = CompactAndRefine(
+            llm=get_llm("gpt-4o-mini"), streaming=True, verbose=True
+        )
+
     @step
     async def ingest(self, ctx: Context, ev: StartEvent) -> StopEvent | None:
-        """Entry point to ingest a document, triggered by a StartEvent with `dirname`."""
+        """Entry point to ingest a document, triggered by a StartEvent with `dirname`.
+
+        Only new or changed files are re-chunked and re-embedded; the index is
+        persisted to `persist_dir` and loaded from there on the next run.
+        """
         dirname = ev.get("dirname")
         if not dirname:
             return None
 
-        documents = SimpleDirectoryReader(dirname).load_data()
-
-        index = VectorStoreIndex.from_documents(
-            documents=documents,
-            embed_model=OpenAIEmbedding(model_name="text-embedding-3-small"),
-        )
+        persist_dir = ev.get("persist_dir") or str(DEFAULT_PERSIST_DIR)
+        # "mmap" for exact search, "ivf" for approximate search on large corpora
+        store_cls = VECTOR_STORES[ev.get("vector_store") or "mmap"]
+        ingestor = self._ingestors.get(persist_dir)
+        if ingestor is None:
+            ingestor = IncrementalIngestor(
+                persist_dir,
+                embed_model=get_cached_embed_model("text-embedding-3-small"),
+                vector_store_loader=store_cls.from_persist_dir,
+            )
+            self._ingestors[persist_dir] = ingestor
+
+        # hashing and embedding are blocking, keep them off the event loop
+        index, stats = await asyncio.to_thread(ingestor.sync, dirname)
+        print(f"Ingestion stats: {stats}")
+        if self._index_versions.get(index.index_id) != ingestor.version:
+            self.response_cache.invalidate(f"{index.index_id}@")
+            self._index_versions[index.index_id] = ingestor.version
         return StopEvent(result=index)
 
     @step
-    async def retrieve(self, ctx: Context, ev: StartEvent) -> RetrieverEvent | None:
-        "Entry point for RAG, triggered by a StartEvent with `query`."
+    async def retrieve(
+        self, ctx: Context, ev: StartEvent
+    ) -> RetrieverEvent | StopEvent | None:
+        """Entry point for RAG, triggered by a StartEvent with `query`.
+
+        A near-duplicate of an earlier query on the same index version is answered
+        from the semantic cache, replayed as a stream. The query is embedded once,
+        for both the cache lookup and retrieval. With `pipelined=True` synthesis
+        starts on the first reranked batch instead of waiting for all of them.
+        Stage timings, TTFT and total latency end up in `metadata["timings"]`.
+        """
+        started = time.perf_counter()
         query = ev.get("query")
         index = ev.get("index")
 
         if not query:
             return None
 
+        # embedding starts now and runs while the rest of the step sets up
+        embed_task = asyncio.create_task(self.response_cache.aembed(query))
         print(f"Query the database with: {query}")
 
         # store the query in the global context
         await ctx.store.set("query", query)
+        await ctx.store.set("started", started)
+        await ctx.store.set("pipelined", bool(ev.get("pipelined")))
 
         # get the index from the global context
         if index is None:
+            embed_task.cancel()
             print("Index is empty, load some documents before querying!")
             return None
 
-        retriever = index.as_retriever(similarity_top_k=2)
-        nodes = await retriever.aretrieve(query)
+        namespace = f"{index.index_id}@{self._index_versions.get(index.index_id, '')}"
+        retriever = index.as_retriever(similarity_top_k=ev.get("similarity_top_k", 2))
+        embedding = await embed_task
+        timings = {"embed": time.perf_counter() - started}
+
+        cached = self.response_cache.lookup(namespace, embedding)
+        if cached is not None:
+            print(f"Semantic cache hit for: {cached.query}")
+            return StopEvent(result=timed_stream(cached.as_stream(), timings, started))
+        await ctx.store.set("cache_key", (namespace, embedding.tolist()))
+
+        stage = time.perf_counter()
+        nodes = await retriever.aretrieve(
+            QueryBundle(query_str=query, embedding=embedding.tolist())
+        )
+        timings["retrieve"] = time.perf_counter() - stage
+        await ctx.store.set("timings", timings)
         print(f"Retrieved {len(nodes)} nodes.")
         return RetrieverEvent(nodes=nodes)
 
     @step
     async def rerank(self, ctx: Context, ev: RetrieverEvent) -> RerankEvent:
         # Rerank the nodes
-        ranker = LLMRerank(
-            choice_batch_size=5, top_n=3, llm=OpenAI(model="gpt-4o-mini")
-        )
-        print(await ctx.store.get("query", default=None), flush=True)
-        new_nodes = ranker.postprocess_nodes(
-            ev.nodes, query_str=await ctx.store.get("query", default=None)
-        )
+        query = await ctx.store.get("query", default=None)
+        timings = await ctx.store.get("timings")
+        print(query, flush=True)
+        stage = time.perf_counter()
+        if await ctx.store.get("pipelined"):
+            # the first batch back with top_n nodes is enough to start answering;
+            # CompactAndRefine can't take nodes mid-stream, so the rest is cancelled
+            new_nodes = []
+            async with aclosing(self.reranker.arerank_iter(ev.nodes, query)) as ranked:
+                async for new_nodes in ranked:
+                    if len(new_nodes) >= self.reranker.top_n:
+                        # answered from part of the candidates: don't cache it
+                        await ctx.store.set("cut_short", True)
+                        break
+        else:
+            new_nodes = await self.reranker.arerank(ev.nodes, query)
+        timings["rerank"] = time.perf_counter() - stage
+        await ctx.store.set("timings", timings)
         print(f"Reranked nodes to {len(new_nodes)}")
         return RerankEvent(nodes=new_nodes)
 
     @step
     async def synthesize(self, ctx: Context, ev: RerankEvent) -> StopEvent:
         """Return a streaming response using reranked nodes."""
-        llm = OpenAI(model="gpt-4o-mini")
-        summarizer = CompactAndRefine(llm=llm, streaming=True, verbose=True)
         query = await ctx.store.get("query", default=None)
+        timings = await ctx.store.get("timings")
+        started = await ctx.store.get("started")
+
+        stage = time.perf_counter()
+        response = await self.summarizer.asynthesize(query, nodes=ev.nodes)
+        timings["synthesize_start"] = time.perf_counter() - stage
+
+        namespace, embedding = await ctx.store.get("cache_key")
+
+        def remember(answer: str) -> None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            self.response_cache.store(namespace, vector, query, answer, ev.nodes)
 
-        response = await summarizer.asynthesize(query, nodes=ev.nodes)
-        return StopEvent(result=response)
+        if not await ctx.store.get("cut_short", default=False):
+            response = record_stream(response, remember)
+        return StopEvent(result=timed_stream(response, timings, started))
+
+
+def timed_stream(
+    response: AsyncStreamingResponse, timings: dict[str, float], started: float
+) -> AsyncStreamingResponse:
+    """Expose `timings` as metadata["timings"], adding TTFT and total on drain."""
+
+    async def gen():
+        async for token in response.async_response_gen():
+            if "ttft" not in timings:
+                timings["ttft"] = time.perf_counter() - started
+            yield token
+        timings["total"] = time.perf_counter() - started
+
+    metadata = dict(response.metadata or {})
+    metadata["timings"] = timings
+    return AsyncStreamingResponse(
+        response_gen=gen(), source_nodes=response.source_nodes, metadata=metadata
+    )
 
 
 async def main():
+    # opt-in: set TRACING_MODE=phoenix|file|otlp to trace this run
+    configure_tracing()
+
     w = RAGWorkflow()
 
     # Ingest the documents
@@ -111,6 +234,7 @@ async def main():
     result = await w.run(query="How was Llama2 trained?", index=index)
     async for chunk in result.async_response_gen():
         print(chunk, end="", flush=True)
+    print(f"\n{result.metadata['timings']}")
 
 
 if __name__ == "__main__":
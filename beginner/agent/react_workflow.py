@@ -1,9 +1,3 @@
-from llama_index.core import set_global_handler
-
-# Enable Phoenix tracing - will connect to Phoenix at localhost:6006
-set_global_handler("arize_phoenix")
-print("Connected to Phoenix at http://localhost:6006")
-
 from llama_index.core.llms import ChatMessage
 from llama_index.core.tools import ToolSelection, ToolOutput
 from llama_index.core.workflow import Event
@@ -29,15 +23,15 @@ class FunctionOutputEvent(Event):
     output: ToolOutput
 
 
+import asyncio
 from typing import Any, List
 
-from llama_index.core.agent.react import ReActChatFormatter, ReActOutputParser
+from llama_index.core.agent.react import ReActOutputParser
 from llama_index.core.agent.react.types import (
     ActionReasoningStep,
     ObservationReasoningStep,
 )
 from llama_index.core.llms.llm import LLM
-from llama_index.core.memory import ChatMemoryBuffer
 from llama_index.core.tools.types import BaseTool
 from llama_index.core.workflow import (
     Context,
@@ -46,7 +40,14 @@ from llama_index.core.workflow import (
     StopEvent,
     step,
 )
-from llama_index.llms.openai import OpenAI
+
+from client_pool import get_llm
+from compact_memory import CompactChatMemory
+from prompt_formatter import IncrementalReActFormatter
+from stream_parser import StreamingActionDetector
+from tool_cache import ToolResultCache
+from tool_executor import ToolExecutor
+from tracing import configure_tracing
 
 
 class ReActAgent(Workflow):
@@ -56,12 +57,21 @@ class ReActAgent(Workflow):
         llm: LLM | None = None,
         tools: list[BaseTool] | None = None,
         extra_context: str | None = None,
+        tool_executor: ToolExecutor | None = None,
+        tool_cache: ToolResultCache | None = None,
         **kwargs: Any,
     ) -> None:
         super().__init__(*args, **kwargs)
         self.tools = tools or []
-        self.llm = llm or OpenAI()
-        self.formatter = ReActChatFormatter.from_defaults(context=extra_context or "")
+        # registry is built once, not on every tool call
+        self.tools_by_name = {tool.metadata.get_name(): tool for tool in self.tools}
+        self.llm = llm or get_llm()
+        self.tool_executor = tool_executor or ToolExecutor()
+        if tool_cache is not None:
+            self.tool_executor.cache = tool_cache
+        self.formatter = IncrementalReActFormatter.from_defaults(
+            context=extra_context or ""
+        )
         self.output_parser = ReActOutputParser()
 
     @step
@@ -72,7 +82,10 @@ class ReActAgent(Workflow):
         # init memory if needed
         memory = await ctx.store.get("memory", default=None)
         if not memory:
-            memory = ChatMemoryBuffer.from_defaults(llm=self.llm)
+            memory = CompactChatMemory.from_defaults(llm=self.llm)
+        elif memory.llm is None:
+            # memory restored from a serialized context
+            memory.llm = self.llm
 
         # get user input
         user_input = ev.input
@@ -81,6 +94,7 @@ class ReActAgent(Workflow):
 
         # clear current reasoning
         await ctx.store.set("current_reasoning", [])
+        await ctx.store.set("rendered_reasoning", [])
 
         # set memory
         await ctx.store.set("memory", memory)
@@ -93,11 +107,16 @@ class ReActAgent(Workflow):
         memory = await ctx.store.get("memory")
         chat_history = memory.get()
         current_reasoning = await ctx.store.get("current_reasoning", default=[])
+        rendered_reasoning = await ctx.store.get("rendered_reasoning", default=[])
 
-        # format the prompt with react instructions
+        # format the prompt with react instructions, only rendering new steps
         llm_input = self.formatter.format(
-            self.tools, chat_history, current_reasoning=current_reasoning
+            self.tools,
+            chat_history,
+            current_reasoning=current_reasoning,
+            rendered_reasoning=rendered_reasoning,
         )
+        await ctx.store.set("rendered_reasoning", rendered_reasoning)
         return InputEvent(input=llm_input)
 
     @step
@@ -109,11 +128,21 @@ class ReActAgent(Workflow):
         memory = await ctx.store.get("memory")
 
         response_gen = await self.llm.astream_chat(chat_history)
+        detector = StreamingActionDetector()
+        reasoning_step = None
         async for response in response_gen:
-            ctx.write_event_to_stream(StreamEvent(delta=response.delta or ""))
+            delta = response.delta or ""
+            ctx.write_event_to_stream(StreamEvent(delta=delta))
+            reasoning_step = detector.feed(delta)
+            if reasoning_step is not None:
+                # the action is complete, stop paying for the trailing tokens
+                if hasattr(response_gen, "aclose"):
+                    await response_gen.aclose()
+                break
 
         try:
-            reasoning_step = self.output_parser.parse(response.message.content)
+            if reasoning_step is None:
+                reasoning_step = self.output_parser.parse(response.message.content)
             current_reasoning.append(reasoning_step)
 
             if reasoning_step.is_done:
@@ -158,13 +187,23 @@ class ReActAgent(Workflow):
     @step
     async def handle_tool_calls(self, ctx: Context, ev: ToolCallEvent) -> PrepEvent:
         tool_calls = ev.tool_calls
-        tools_by_name = {tool.metadata.get_name(): tool for tool in self.tools}
+        tools_by_name = self.tools_by_name
         current_reasoning = await ctx.store.get("current_reasoning", default=[])
         sources = await ctx.store.get("sources", default=[])
 
-        # call tools -- safely!
+        # resolve tools first so observations keep the original call order
+        resolved = []
         for tool_call in tool_calls:
             tool = tools_by_name.get(tool_call.tool_name)
+            resolved.append((tool, tool_call))
+
+        # call tools -- safely and concurrently!
+        outputs = await self.tool_executor.execute(
+            [(tool, tool_call) for tool, tool_call in resolved if tool]
+        )
+        outputs = iter(outputs)
+
+        for tool, tool_call in resolved:
             if not tool:
                 current_reasoning.append(
                     ObservationReasoningStep(
@@ -173,18 +212,24 @@ class ReActAgent(Workflow):
                 )
                 continue
 
-            try:
-                tool_output = tool(**tool_call.tool_kwargs)
-                sources.append(tool_output)
+            tool_output = next(outputs)
+            if isinstance(tool_output, asyncio.TimeoutError):
                 current_reasoning.append(
-                    ObservationReasoningStep(observation=tool_output.content)
+                    ObservationReasoningStep(
+                        observation=f"Tool {tool.metadata.get_name()} timed out"
+                    )
                 )
-            except Exception as e:
+            elif isinstance(tool_output, BaseException):
                 current_reasoning.append(
                     ObservationReasoningStep(
-                        observation=f"Error calling tool {tool.metadata.get_name()}: {e}"
+                        observation=f"Error calling tool {tool.metadata.get_name()}: {tool_output}"
                     )
                 )
+            else:
+                sources.append(tool_output)
+                current_reasoning.append(
+                    ObservationReasoningStep(observation=tool_output.content)
+                )
 
         # save new state in context
         await ctx.store.set("sources", sources)
@@ -195,8 +240,10 @@ class ReActAgent(Workflow):
 
 
 async def main():
+    # opt-in: set TRACING_MODE=phoenix|file|otlp to trace this run
+    configure_tracing()
+
     from llama_index.core.tools import FunctionTool
-    from llama_index.llms.openai import OpenAI
 
     def add(x: int, y: int) -> int:
         """Useful function to add two numbers."""
@@ -210,6 +257,8 @@ async def main():
         FunctionTool.from_defaults(add),
         FunctionTool.from_defaults(multiply),
     ]
+    # add/multiply are pure, so repeated calls can be served from the cache
+    tool_cache = ToolResultCache(tools=["add", "multiply"])
 
     # agent = ReActAgent(
     #     llm=OpenAI(model="gpt-4o"), tools=tools, timeout=120, verbose=True
@@ -222,7 +271,11 @@ async def main():
 
 ## Streaming example
     agent = ReActAgent(
-        llm=OpenAI(model="gpt-4o"), tools=tools, timeout=120, verbose=False
+        llm=get_llm("gpt-4o"),
+        tools=tools,
+        tool_cache=tool_cache,
+        timeout=120,
+        verbose=False,
     )
 
     handler = agent.run(input="Hello! Tell me a joke.")
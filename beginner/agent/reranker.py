@@ -0,0 +1,164 @@
+"""
+Rerankers for RAGWorkflow, built once and reused across queries.
+
+`AsyncLLMReranker` uses the same prompt and parsing as `LLMRerank`, but sends the
+choice batches concurrently through `apredict` instead of one after another with
+the blocking `predict`. It stops early, cancelling the remaining batches, once
+`top_n` nodes have come back at or above `confident_score`.
+
+`LocalReranker` makes no LLM call: it blends embedding cosine (the retrieval
+score, or a fresh embedding when there is none) with lexical overlap between the
+query and the node text.
+"""
+
+import asyncio
+import math
+import re
+from contextlib import aclosing
+from typing import AsyncIterator
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.indices.utils import (
+    default_format_node_batch_fn,
+    default_parse_choice_select_answer_fn,
+)
+from llama_index.core.llms.llm import LLM
+from llama_index.core.prompts.default_prompts import DEFAULT_CHOICE_SELECT_PROMPT
+from llama_index.core.schema import MetadataMode, NodeWithScore
+
+WORD = re.compile(r"\w+")
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from how in is it of on or the to"
+    " was were what when where which who why with".split()
+)
+
+
+def _terms(text: str) -> set[str]:
+    return {word for word in WORD.findall(text.lower()) if word not in STOPWORDS}
+
+
+class AsyncLLMReranker:
+    def __init__(
+        self,
+        llm: LLM,
+        top_n: int = 3,
+        choice_batch_size: int = 5,
+        max_concurrency: int = 4,
+        confident_score: float | None = 8.0,
+    ) -> None:
+        self.llm = llm
+        self.top_n = top_n
+        self.choice_batch_size = choice_batch_size
+        self.confident_score = confident_score
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def _rank_batch(
+        self, query: str, batch: list[NodeWithScore]
+    ) -> list[NodeWithScore]:
+        nodes = [node.node for node in batch]
+        async with self._semaphore:
+            raw_response = await self.llm.apredict(
+                DEFAULT_CHOICE_SELECT_PROMPT,
+                context_str=default_format_node_batch_fn(nodes),
+                query_str=query,
+            )
+        raw_choices, relevances = default_parse_choice_select_answer_fn(
+            raw_response, len(nodes)
+        )
+        chosen = [nodes[int(choice) - 1] for choice in raw_choices]
+        relevances = relevances or [1.0] * len(chosen)
+        return [
+            NodeWithScore(node=node, score=relevance)
+            for node, relevance in zip(chosen, relevances)
+        ]
+
+    async def arerank_iter(
+        self, nodes: list[NodeWithScore], query: str
+    ) -> AsyncIterator[list[NodeWithScore]]:
+        """Yield the best `top_n` so far each time a batch comes back."""
+        batches = [
+            nodes[i : i + self.choice_batch_size]
+            for i in range(0, len(nodes), self.choice_batch_size)
+        ]
+        tasks = [asyncio.create_task(self._rank_batch(query, b)) for b in batches]
+
+        results: list[NodeWithScore] = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                results.extend(await next_done)
+                results.sort(key=lambda node: node.score or 0.0, reverse=True)
+                yield results[: self.top_n]
+                if self._confident(results):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def arerank(
+        self, nodes: list[NodeWithScore], query: str
+    ) -> list[NodeWithScore]:
+        ranked: list[NodeWithScore] = []
+        async with aclosing(self.arerank_iter(nodes, query)) as batches:
+            async for ranked in batches:
+                pass
+        return ranked
+
+    def _confident(self, results: list[NodeWithScore]) -> bool:
+        if self.confident_score is None:
+            return False
+        confident = [r for r in results if (r.score or 0.0) >= self.confident_score]
+        return len(confident) >= self.top_n
+
+
+class LocalReranker:
+    def __init__(
+        self,
+        top_n: int = 3,
+        embed_model: BaseEmbedding | None = None,
+        lexical_weight: float = 0.3,
+    ) -> None:
+        self.top_n = top_n
+        self.embed_model = embed_model
+        self.lexical_weight = lexical_weight
+
+    async def _cosines(self, nodes: list[NodeWithScore], query: str) -> list[float]:
+        if all(node.score is not None for node in nodes) or self.embed_model is None:
+            return [node.score or 0.0 for node in nodes]
+
+        query_embedding = await self.embed_model.aget_query_embedding(query)
+        texts = [node.node.get_content(MetadataMode.EMBED) for node in nodes]
+        embeddings = await self.embed_model.aget_text_embedding_batch(texts)
+        return [_cosine(query_embedding, embedding) for embedding in embeddings]
+
+    async def arerank(
+        self, nodes: list[NodeWithScore], query: str
+    ) -> list[NodeWithScore]:
+        if not nodes:
+            return []
+        cosines = await self._cosines(nodes, query)
+        query_terms = _terms(query)
+
+        reranked = []
+        for node, cosine in zip(nodes, cosines):
+            overlap = 0.0
+            if query_terms:
+                overlap = len(query_terms & _terms(node.node.get_content())) / len(
+                    query_terms
+                )
+            score = (1 - self.lexical_weight) * cosine + self.lexical_weight * overlap
+            reranked.append(NodeWithScore(node=node.node, score=score))
+
+        reranked.sort(key=lambda node: node.score, reverse=True)
+        return reranked[: self.top_n]
+
+    async def arerank_iter(
+        self, nodes: list[NodeWithScore], query: str
+    ) -> AsyncIterator[list[NodeWithScore]]:
+        # scoring is local and fast, there is only ever one batch
+        yield await self.arerank(nodes, query)
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
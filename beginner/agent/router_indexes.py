@@ -0,0 +1,248 @@
+"""
+Lazily built, persisted indexes behind the router's query engine tools.
+
+Nothing is read, parsed or embedded until a tool is first queried. The first
+build persists the docstore, the vector index struct, the IVF vectors, the BM25
+postings and the summary tree under `persist_dir`; later runs load them (the
+vector matrix and postings memory-mapped) instead of re-embedding the corpus.
+A fingerprint of the data files triggers a rebuild when the corpus changes; the
+summary tree is kept across rebuilds so only changed branches are re-summarized.
+"""
+
+import asyncio
+import hashlib
+import shutil
+import threading
+from pathlib import Path
+from typing import Callable
+
+from llama_index.core import (
+    Settings,
+    SimpleDirectoryReader,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import RESPONSE_TYPE
+from llama_index.core.query_engine import RetrieverQueryEngine
+from llama_index.core.schema import MetadataMode, QueryBundle
+from llama_index.core.tools import QueryEngineTool
+
+from bm25_index import BM25Index, BM25Retriever, FusionRetriever, build_bm25
+from incremental_ingest import parse_nodes
+from ivf_vector_store import IVFVectorStore
+from process_pool import should_offload
+from summary_tree import SUMMARY_TREE_NAME, SummaryTree, SummaryTreeQueryEngine
+
+DEFAULT_DATA_DIR = Path(__file__).parent / "data" / "paul_graham"
+DEFAULT_PERSIST_DIR = Path(__file__).parent / "output" / "router_storage"
+FINGERPRINT_NAME = "router_fingerprint.txt"
+
+
+class LazyQueryEngine(BaseQueryEngine):
+    """Builds the wrapped query engine on its first query."""
+
+    def __init__(self, factory: Callable[[], BaseQueryEngine]) -> None:
+        super().__init__(callback_manager=None)
+        self._factory = factory
+        self._engine: BaseQueryEngine | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self) -> BaseQueryEngine:
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._factory()
+        return self._engine
+
+    def _get_prompt_modules(self) -> dict:
+        return {}
+
+    def _query(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        return self.engine.query(query_bundle)
+
+    async def _aquery(self, query_bundle: QueryBundle) -> RESPONSE_TYPE:
+        if self._engine is None:
+            # building reads and embeds the corpus, keep it off the event loop
+            await asyncio.to_thread(lambda: self.engine)
+        return await self.engine.aquery(query_bundle)
+
+
+class RouterIndexes:
+    def __init__(
+        self,
+        data_dir: str | Path = DEFAULT_DATA_DIR,
+        persist_dir: str | Path = DEFAULT_PERSIST_DIR,
+    ) -> None:
+        self.data_dir = Path(data_dir)
+        self.persist_dir = Path(persist_dir)
+        self._storage_context: StorageContext | None = None
+        self._indexes: dict[str, object] = {}
+        self._lock = threading.RLock()
+        self._version: str | None = None
+
+    def _fingerprint(self) -> str:
+        digest = hashlib.sha256()
+        for path in sorted(self.data_dir.rglob("*")):
+            if path.is_file():
+                digest.update(str(path.relative_to(self.data_dir)).encode())
+                digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    @property
+    def version(self) -> str:
+        """Fingerprint of the corpus these indexes are built from.
+
+        Computed once per instance, so it names the indexes actually served even
+        if the files change later; a new `RouterIndexes` picks up the change.
+        """
+        with self._lock:
+            if self._version is None:
+                self._version = self._fingerprint()
+            return self._version
+
+    def storage_context(self) -> StorageContext:
+        """The persisted storage, or a fresh one holding the parsed corpus."""
+        with self._lock:
+            if self._storage_context is not None:
+                return self._storage_context
+
+            fingerprint_path = self.persist_dir / FINGERPRINT_NAME
+            fingerprint = self.version
+            if (
+                fingerprint_path.exists()
+                and fingerprint_path.read_text() == fingerprint
+            ):
+                self._storage_context = StorageContext.from_defaults(
+                    persist_dir=str(self.persist_dir),
+                    vector_store=IVFVectorStore.from_persist_dir(str(self.persist_dir)),
+                )
+                return self._storage_context
+
+            # the corpus changed (or was never indexed): start over, except for
+            # the summary tree, whose unchanged branches are reused
+            if self.persist_dir.exists():
+                for path in self.persist_dir.iterdir():
+                    if path.name == SUMMARY_TREE_NAME:
+                        continue
+                    if path.is_dir():
+                        shutil.rmtree(path)
+                    else:
+                        path.unlink()
+            documents = SimpleDirectoryReader(str(self.data_dir)).load_data()
+            nodes = parse_nodes(Settings.node_parser, documents)
+            self._storage_context = StorageContext.from_defaults(
+                vector_store=IVFVectorStore()
+            )
+            self._storage_context.docstore.add_documents(nodes)
+            self._persist()
+            fingerprint_path.write_text(fingerprint)
+            return self._storage_context
+
+    def _persist(self) -> None:
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        self._storage_context.persist(persist_dir=str(self.persist_dir))
+
+    def _load_or_build(self, index_id: str, build: Callable) -> object:
+        with self._lock:
+            index = self._indexes.get(index_id)
+            if index is not None:
+                return index
+            storage_context = self.storage_context()
+            if storage_context.index_store.get_index_struct(index_id) is not None:
+                index = load_index_from_storage(storage_context, index_id=index_id)
+            else:
+                nodes = list(storage_context.docstore.docs.values())
+                index = build(nodes, storage_context=storage_context)
+                index.set_index_id(index_id)
+                self._persist()
+            self._indexes[index_id] = index
+            return index
+
+    def summary_tree(self) -> SummaryTree:
+        with self._lock:
+            tree = self._indexes.get("summary_tree")
+            if tree is None:
+                storage_context = self.storage_context()
+                tree = SummaryTree(Settings.llm, self.persist_dir / SUMMARY_TREE_NAME)
+                # a tree whose chunks don't match the docstore is stale
+                nodes = list(storage_context.docstore.docs.values())
+                if not tree.is_current(nodes):
+                    print(f"Summary tree: {tree.build(nodes)}")
+                self._indexes["summary_tree"] = tree
+            return tree
+
+    def vector_index(self) -> VectorStoreIndex:
+        # IVF falls back to exact search until the corpus is large enough to train
+        return self._load_or_build("vector", VectorStoreIndex)
+
+    def keyword_index(self) -> BM25Index:
+        with self._lock:
+            index = self._indexes.get("keyword")
+            if index is None:
+                storage_context = self.storage_context()
+                index = BM25Index.from_persist_dir(str(self.persist_dir))
+                if index.num_docs == 0:
+                    nodes = list(storage_context.docstore.docs.values())
+                    texts = [node.get_content(MetadataMode.NONE) for node in nodes]
+                    if should_offload(sum(len(text) for text in texts)):
+                        # tokenizing holds the GIL; keep it off the serving process
+                        ids = [node.node_id for node in nodes]
+                        index = build_bm25.map([(ids, texts)])[0]
+                    else:
+                        index = BM25Index.from_nodes(nodes)
+                    index.persist(str(self.persist_dir))
+                self._indexes["keyword"] = index
+            return index
+
+
+def build_query_engine_tools(indexes: RouterIndexes) -> list[QueryEngineTool]:
+    """The list, vector and keyword tools; each index is built on first use."""
+    # answers from precomputed summaries instead of re-summarizing every chunk
+    list_query_engine = LazyQueryEngine(
+        lambda: SummaryTreeQueryEngine(indexes.summary_tree(), Settings.llm)
+    )
+    vector_query_engine = LazyQueryEngine(
+        lambda: indexes.vector_index().as_query_engine()
+    )
+    # keyword hits fused with vector hits by reciprocal rank
+    keyword_query_engine = LazyQueryEngine(
+        lambda: RetrieverQueryEngine.from_args(
+            FusionRetriever(
+                [
+                    BM25Retriever(
+                        indexes.keyword_index(), indexes.storage_context().docstore
+                    ),
+                    indexes.vector_index().as_retriever(),
+                ]
+            )
+        )
+    )
+
+    list_tool = QueryEngineTool.from_defaults(
+        query_engine=list_query_engine,
+        description=(
+            "Useful for summarization questions related to Paul Graham eassy on"
+            " What I Worked On."
+        ),
+    )
+
+    vector_tool = QueryEngineTool.from_defaults(
+        query_engine=vector_query_engine,
+        description=(
+            "Useful for retrieving specific context from Paul Graham essay on What"
+            " I Worked On."
+        ),
+    )
+
+    keyword_tool = QueryEngineTool.from_defaults(
+        query_engine=keyword_query_engine,
+        description=(
+            "Useful for retrieving specific context using keywords from Paul"
+            " Graham essay on What I Worked On."
+        ),
+    )
+
+    return [list_tool, vector_tool, keyword_tool]
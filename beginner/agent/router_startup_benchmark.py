@@ -0,0 +1,90 @@
+"""
+Startup cost of router_workflow: import time and time to first query.
+
+    python router_startup_benchmark.py --repeats 3
+    python router_startup_benchmark.py --offline   # MockEmbedding + ScriptedLLM
+
+Every measurement runs in a fresh interpreter. "cold" deletes the persisted
+indexes first, so the first query parses and embeds the corpus; "warm" reuses
+what the previous run saved. The first query goes straight to one tool's query
+engine, so routing and synthesis across tools are not part of the number.
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PERSIST_DIR = Path(__file__).parent / "output" / "router_startup_bench"
+
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+import router_workflow
+from router_indexes import RouterIndexes, build_query_engine_tools
+imported = time.perf_counter()
+
+persist_dir, tool_index, offline, query = sys.argv[1:5]
+if offline == "1":
+    from llama_index.core.embeddings import MockEmbedding
+    from fake_llm import ScriptedLLM
+    router_workflow.configure_settings(
+        llm=ScriptedLLM(script=["The essay is about what the author worked on."]),
+        embed_model=MockEmbedding(embed_dim=256),
+    )
+else:
+    router_workflow.configure_settings()
+tools = build_query_engine_tools(RouterIndexes(persist_dir=persist_dir))
+ready = time.perf_counter()
+
+asyncio.run(tools[int(tool_index)].query_engine.aquery(query))
+answered = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "setup_s": ready - imported,
+    "first_query_s": answered - ready,
+    "total_s": answered - start,
+}))
+"""
+
+
+def run_child(tool: int, offline: bool, query: str) -> dict[str, float]:
+    argv = [str(PERSIST_DIR), str(tool), str(int(offline)), query]
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, *argv],
+        cwd=Path(__file__).parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--tool", type=int, default=1, help="0 list, 1 vector, 2 keyword"
+    )
+    parser.add_argument("--query", default="What did the author do at Viaweb?")
+    parser.add_argument("--offline", action="store_true")
+    args = parser.parse_args()
+
+    results: dict[str, list[dict[str, float]]] = {"cold": [], "warm": []}
+    for _ in range(args.repeats):
+        shutil.rmtree(PERSIST_DIR, ignore_errors=True)
+        results["cold"].append(run_child(args.tool, args.offline, args.query))
+        results["warm"].append(run_child(args.tool, args.offline, args.query))
+
+    keys = ["import_s", "setup_s", "first_query_s", "total_s"]
+    print(f"{'':>6}" + "".join(f"{key:>15}" for key in keys))
+    for mode, runs in results.items():
+        medians = [statistics.median(run[key] for run in runs) for key in keys]
+        print(f"{mode:>6}" + "".join(f"{value:>15.3f}" for value in medians))
+
+
+if __name__ == "__main__":
+    main()
@@ -25,7 +25,6 @@ from llama_index.core.workflow import (
     step,
 )
 
-from llama_index.llms.openai import OpenAI
 from llama_index.core.selectors.utils import get_selector_from_llm
 from llama_index.core.base.response.schema import (
     PydanticResponse,
@@ -34,37 +33,111 @@ from llama_index.core.base.response.schema import (
 )
 from llama_index.core.bridge.pydantic import BaseModel
 from llama_index.core.response_synthesizers import TreeSummarize
+from llama_index.core.prompts.default_prompt_selectors import (
+    DEFAULT_TREE_SUMMARIZE_PROMPT_SEL,
+)
 from llama_index.core.schema import QueryBundle
 from llama_index.core import Settings
 
-from IPython.display import Markdown, display
 import asyncio
+from functools import partial
+
+import numpy as np
+
+from client_pool import get_llm
+from embedding_cache import get_cached_embed_model
+from embedding_selector import EmbeddingSelector
+from fan_in import IncrementalCombiner, fan_in
+from router_indexes import RouterIndexes, build_query_engine_tools
+from semantic_cache import SemanticResponseCache, record_stream
 
 
 class RouterQueryEngineWorkflow(Workflow):
+    def __init__(
+        self,
+        *args: Any,
+        response_cache: SemanticResponseCache | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.response_cache = response_cache or SemanticResponseCache(
+            get_cached_embed_model("text-embedding-3-small")
+        )
+        # one per is_multi, so tool description embeddings are computed once
+        self._embedding_selectors: dict[bool, EmbeddingSelector] = {}
+        # the index version answers were last cached for
+        self._index_version: str | None = None
+
+    def _embedding_selector(self, is_multi: bool) -> EmbeddingSelector:
+        selector = self._embedding_selectors.get(is_multi)
+        if selector is None:
+            selector = self._embedding_selectors[is_multi] = EmbeddingSelector(
+                self.response_cache.embed_model, llm=Settings.llm, is_multi=is_multi
+            )
+        return selector
+
     @step
-    async def selector(self, ctx: Context, ev: StartEvent) -> QueryEngineSelectionEvent:
+    async def selector(
+        self, ctx: Context, ev: StartEvent
+    ) -> QueryEngineSelectionEvent | StopEvent:
         """
         Selects a single/ multiple query engines based on the query.
+
+        Near-duplicate queries are answered from the semantic cache, keyed by
+        the version of `indexes` (the `RouterIndexes` behind the tools) or an
+        explicit `index_version`. Without either, answers are not cached, since
+        nothing would tell a rebuilt index from the old one.
+        With `selector_mode="embedding"` (the default) tools are picked by
+        embedding similarity and the LLM selector only breaks close calls;
+        `selector_mode="llm"` always asks the LLM.
         """
 
+        query = ev.get("query")
+        indexes = ev.get("indexes")
+        index_version = indexes.version if indexes else ev.get("index_version")
+        embedding = await self.response_cache.aembed(query)
+        namespace = None
+        if index_version:
+            if index_version != self._index_version:
+                # the indexes were rebuilt: answers from the old ones are stale
+                self.response_cache.invalidate("router@")
+                self._index_version = index_version
+            namespace = f"router@{index_version}"
+            cached = self.response_cache.lookup(namespace, embedding)
+            if cached is not None:
+                print(f"Semantic cache hit for: {cached.query}")
+                return StopEvent(result=cached.as_response())
+        await ctx.store.set("cache_key", (namespace, embedding.tolist()))
+
         await ctx.store.set("query", ev.get("query"))
         await ctx.store.set("llm", ev.get("llm"))
         await ctx.store.set("query_engine_tools", ev.get("query_engine_tools"))
         await ctx.store.set("summarizer", ev.get("summarizer"))
+        # fan-in mode: combine answers as they arrive, give up on stragglers
+        await ctx.store.set("deadline", ev.get("deadline"))
+        await ctx.store.set("hedge_after", ev.get("hedge_after"))
 
         llm = Settings.llm
         select_multiple_query_engines = ev.get("select_multi")
         query = ev.get("query")
         query_engine_tools = ev.get("query_engine_tools")
 
-        selector = get_selector_from_llm(llm, is_multi=select_multiple_query_engines)
+        if ev.get("selector_mode", "embedding") == "embedding":
+            selector = self._embedding_selector(bool(select_multiple_query_engines))
+        else:
+            selector = get_selector_from_llm(
+                llm, is_multi=select_multiple_query_engines
+            )
 
         query_engines_metadata = [
             query_engine.metadata for query_engine in query_engine_tools
         ]
 
-        selected_query_engines = await selector.aselect(query_engines_metadata, query)
+        # reuse the embedding computed for the cache lookup
+        query_bundle = QueryBundle(query_str=query, embedding=embedding.tolist())
+        selected_query_engines = await selector.aselect(
+            query_engines_metadata, query_bundle
+        )
 
         return QueryEngineSelectionEvent(selected_query_engines=selected_query_engines)
 
@@ -72,7 +145,12 @@ class RouterQueryEngineWorkflow(Workflow):
     async def generate_responses(
         self, ctx: Context, ev: QueryEngineSelectionEvent
     ) -> SynthesizeEvent:
-        """Generate the responses from the selected query engines."""
+        """Generate the responses from the selected query engines.
+
+        With `deadline` (seconds) or `hedge_after` set on the StartEvent, answers
+        are folded into a running summary as they arrive and the result is
+        partial if the deadline passes first.
+        """
 
         query = await ctx.store.get("query", default=None)
         selected_query_engines = ev.selected_query_engines
@@ -84,7 +162,23 @@ class RouterQueryEngineWorkflow(Workflow):
             f"number of selected query engines: {len(selected_query_engines.selections)}"
         )
 
-        if len(selected_query_engines.selections) > 1:
+        deadline = await ctx.store.get("deadline", default=None)
+        hedge_after = await ctx.store.get("hedge_after", default=None)
+        if deadline is not None or hedge_after is not None:
+            selected = [
+                query_engines[selection.index]
+                for selection in selected_query_engines.selections
+            ]
+            summarizer = await ctx.store.get("summarizer")
+            response = await fan_in(
+                [partial(engine.aquery, query) for engine in selected],
+                IncrementalCombiner(summarizer, query),
+                deadline=deadline,
+                hedge_after=hedge_after,
+            )
+            response_generated = [response]
+
+        elif len(selected_query_engines.selections) > 1:
             tasks = []
             for selected_query_engine in selected_query_engines.selections:
                 print(
@@ -161,84 +255,59 @@ class RouterQueryEngineWorkflow(Workflow):
         response.metadata = response.metadata or {}
         response.metadata["selector_result"] = selected_query_engines
 
-        return StopEvent(result=response)
+        namespace, embedding = await ctx.store.get("cache_key")
+        if namespace is None:
+            return StopEvent(result=response)
 
+        def remember(answer: str) -> None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            self.response_cache.store(
+                namespace, vector, query, answer, response.source_nodes
+            )
 
-llm = OpenAI(model="gpt-4o-mini")
-Settings.llm = llm
-from llama_index.core.prompts.default_prompt_selectors import (
-    DEFAULT_TREE_SUMMARIZE_PROMPT_SEL,
-)
+        if isinstance(response, AsyncStreamingResponse):
+            response = record_stream(response, remember)
+        elif not response.metadata.get("partial"):
+            remember(str(response))
 
-summarizer = TreeSummarize(
-    llm=llm,
-    summary_template=DEFAULT_TREE_SUMMARIZE_PROMPT_SEL,
-)
-from llama_index.core import SimpleDirectoryReader
-from pathlib import Path
-
-# Use Path(__file__).parent to get correct path relative to script location
-data_dir = Path(__file__).parent / "data" / "paul_graham"
-documents = SimpleDirectoryReader(str(data_dir)).load_data()
-nodes = Settings.node_parser.get_nodes_from_documents(documents)
-from llama_index.core import (
-    VectorStoreIndex,
-    SummaryIndex,
-    SimpleKeywordTableIndex,
-)
+        return StopEvent(result=response)
 
-summary_index = SummaryIndex(nodes)
-vector_index = VectorStoreIndex(nodes)
-keyword_index = SimpleKeywordTableIndex(nodes)
-from llama_index.core.tools import QueryEngineTool
 
-list_query_engine = summary_index.as_query_engine(
-    response_mode="tree_summarize",
-    use_async=True,
-)
-vector_query_engine = vector_index.as_query_engine()
-keyword_query_engine = keyword_index.as_query_engine()
-
-list_tool = QueryEngineTool.from_defaults(
-    query_engine=list_query_engine,
-    description=(
-        "Useful for summarization questions related to Paul Graham eassy on"
-        " What I Worked On."
-    ),
-)
+def configure_settings(llm=None, embed_model=None) -> None:
+    """Set the global LLM and embedding model; nothing here runs at import."""
+    Settings.llm = llm or get_llm("gpt-4o-mini")
+    Settings.embed_model = embed_model or get_cached_embed_model(
+        "text-embedding-3-small"
+    )
 
-vector_tool = QueryEngineTool.from_defaults(
-    query_engine=vector_query_engine,
-    description=(
-        "Useful for retrieving specific context from Paul Graham essay on What"
-        " I Worked On."
-    ),
-)
 
-keyword_tool = QueryEngineTool.from_defaults(
-    query_engine=keyword_query_engine,
-    description=(
-        "Useful for retrieving specific context using keywords from Paul"
-        " Graham essay on What I Worked On."
-    ),
-)
+def build_summarizer(llm) -> TreeSummarize:
+    return TreeSummarize(
+        llm=llm,
+        summary_template=DEFAULT_TREE_SUMMARIZE_PROMPT_SEL,
+    )
 
-query_engine_tools = [list_tool, vector_tool, keyword_tool]
 
 async def run_router_workflow():
     import nest_asyncio
 
     nest_asyncio.apply()
 
+    configure_settings()
+    # indexes are loaded from output/router_storage, or built and saved there
+    indexes = RouterIndexes()
+    query_engine_tools = build_query_engine_tools(indexes)
+
     w = RouterQueryEngineWorkflow(timeout=200)
     
     query = "Provide the summary of the document?"
 
     result = await w.run(
         query=query,
-        llm=llm,
+        llm=Settings.llm,
         query_engine_tools=query_engine_tools,
-        summarizer=summarizer,
+        indexes=indexes,
+        summarizer=build_summarizer(Settings.llm),
         select_multi=True,  # You can change it to default it to select only one query engine.
     )
     print(result)
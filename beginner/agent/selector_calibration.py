@@ -0,0 +1,126 @@
+"""
+Pick `threshold` and `margin` for EmbeddingSelector from labelled questions.
+
+    python selector_calibration.py --model text-embedding-3-small
+    python selector_calibration.py --max-escalation 0.2 --out output/selector.json
+
+Embeds the router's tool descriptions and the questions below (through the
+shared embedding cache, so reruns are free), then replays the selector's
+decision for every threshold/margin pair without an LLM. For each pair it
+reports how often the selector escalates and, for the questions it decides
+itself, how often it picks an acceptable tool. The recommended pair is the most
+accurate one that escalates at most `--max-escalation` of the questions.
+Needs the real embedding model: the offline stand-in's vectors are hashed
+words, not meanings.
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from embedding_cache import get_cached_embed_model
+from embedding_selector import EmbeddingSelector, _unit
+from router_indexes import RouterIndexes, build_query_engine_tools
+
+SUMMARY, VECTOR, KEYWORD = 0, 1, 2
+# question -> tools that would answer it well
+LABELLED = [
+    ("Provide the summary of the document?", {SUMMARY}),
+    ("Summarize the essay.", {SUMMARY}),
+    ("What is the essay about overall?", {SUMMARY}),
+    ("Give me a short overview of what the author worked on.", {SUMMARY}),
+    ("What are the main themes of What I Worked On?", {SUMMARY}),
+    ("Summarize the author's career in a few sentences.", {SUMMARY}),
+    ("What did the author work on before college?", {VECTOR, KEYWORD}),
+    ("How did Viaweb start?", {VECTOR, KEYWORD}),
+    ("What did the author learn from painting?", {VECTOR, KEYWORD}),
+    ("Why did the author leave Y Combinator?", {VECTOR, KEYWORD}),
+    ("What language did the author program the IBM 1401 in?", {VECTOR, KEYWORD}),
+    ("Who was Jessica Livingston?", {VECTOR, KEYWORD}),
+    ("What was the Summer Founders Program?", {VECTOR, KEYWORD}),
+    ("What happened at Interleaf?", {VECTOR, KEYWORD}),
+    ("What is Arc?", {VECTOR, KEYWORD}),
+    ("Where did the author study art?", {VECTOR, KEYWORD}),
+    ("Find the passage mentioning Hacker News.", {KEYWORD, VECTOR}),
+    ("Which parts mention Lisp?", {KEYWORD, VECTOR}),
+    ("Look up RISD in the essay.", {KEYWORD, VECTOR}),
+    ("Where does the essay talk about Bel?", {KEYWORD, VECTOR}),
+]
+THRESHOLDS = [round(0.05 * i, 2) for i in range(1, 13)]
+MARGINS = [0.0, 0.01, 0.02, 0.03, 0.05, 0.08]
+
+
+def evaluate(
+    selector: EmbeddingSelector,
+    scores: np.ndarray,
+    labels: list[set[int]],
+) -> dict[str, float]:
+    decided = correct = 0
+    for row, acceptable in zip(scores, labels):
+        result = selector._decide(row, selector.margin)
+        if result is None:
+            continue
+        decided += 1
+        picked = {selection.index for selection in result.selections}
+        # multi mode must not pull in a tool that doesn't fit
+        correct += picked <= acceptable
+    return {
+        "threshold": selector.threshold,
+        "margin": selector.margin,
+        "escalation_rate": 1 - decided / len(labels),
+        "accuracy": correct / decided if decided else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="text-embedding-3-small")
+    parser.add_argument("--multi", action="store_true", help="multi-select mode")
+    parser.add_argument("--max-escalation", type=float, default=0.3)
+    parser.add_argument("--out", default=None, help="write JSON results here")
+    args = parser.parse_args()
+
+    embed_model = get_cached_embed_model(args.model)
+    choices = [tool.metadata for tool in build_query_engine_tools(RouterIndexes())]
+    selector = EmbeddingSelector(embed_model, is_multi=args.multi)
+    queries = [query for query, _ in LABELLED]
+    labels = [acceptable for _, acceptable in LABELLED]
+    # scores are fixed per question; only the decision rule changes in the sweep
+    matrix = selector._matrix(choices)
+    scores = np.stack(
+        [
+            matrix @ _unit(vector)
+            for vector in embed_model.get_text_embedding_batch(queries)
+        ]
+    )
+    print(f"score range: {scores.min():.3f} .. {scores.max():.3f}")
+
+    rows = []
+    for threshold in THRESHOLDS:
+        for margin in MARGINS:
+            selector.threshold, selector.margin = threshold, margin
+            rows.append(evaluate(selector, scores, labels))
+
+    print(f"{'threshold':>9} {'margin':>7} {'escalated':>10} {'accuracy':>9}")
+    for row in rows:
+        print(
+            f"{row['threshold']:>9.2f} {row['margin']:>7.2f}"
+            f" {row['escalation_rate']:>10.0%} {row['accuracy']:>9.0%}"
+        )
+    allowed = [row for row in rows if row["escalation_rate"] <= args.max_escalation]
+    best = max(
+        allowed or rows, key=lambda row: (row["accuracy"], -row["escalation_rate"])
+    )
+    print(f"recommended: threshold={best['threshold']} margin={best['margin']}")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        result = {"config": vars(args), "results": rows, "recommended": best}
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
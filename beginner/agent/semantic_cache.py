@@ -0,0 +1,176 @@
+"""
+Semantic response cache for the RAG and router workflows.
+
+A query is embedded and compared, with one matrix-vector product, against the
+queries already answered in the same namespace (an index id plus its version).
+Above `threshold` cosine the stored answer and source nodes are returned, either
+as a plain `Response` or replayed as an `AsyncStreamingResponse`. Entries expire
+after `ttl` seconds and the cache keeps at most `max_entries` in LRU order.
+`invalidate(prefix)` drops every namespace of an index after ingestion changes it.
+"""
+
+import time
+from collections import OrderedDict
+from typing import AsyncGenerator
+
+import numpy as np
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.response.schema import AsyncStreamingResponse, Response
+from llama_index.core.schema import NodeWithScore
+
+
+class CachedAnswer:
+    __slots__ = ("query", "answer", "source_nodes", "created_at")
+
+    def __init__(self, query: str, answer: str, source_nodes: list[NodeWithScore]):
+        self.query = query
+        self.answer = answer
+        self.source_nodes = source_nodes
+        self.created_at = time.monotonic()
+
+    def as_response(self) -> Response:
+        return Response(
+            response=self.answer,
+            source_nodes=self.source_nodes,
+            metadata={"cache_hit": True, "cached_query": self.query},
+        )
+
+    def as_stream(self, chunk_size: int = 16) -> AsyncStreamingResponse:
+        async def replay() -> AsyncGenerator[str, None]:
+            for start in range(0, len(self.answer), chunk_size):
+                yield self.answer[start : start + chunk_size]
+
+        return AsyncStreamingResponse(
+            response_gen=replay(),
+            source_nodes=self.source_nodes,
+            metadata={"cache_hit": True, "cached_query": self.query},
+        )
+
+
+class _Namespace:
+    def __init__(self) -> None:
+        self.entries: OrderedDict[int, tuple[np.ndarray, CachedAnswer]] = OrderedDict()
+        self._matrix: np.ndarray | None = None
+        self._keys: list[int] = []
+
+    def matrix(self) -> tuple[np.ndarray, list[int]]:
+        # rebuilt only after the entry set changes, not on every lookup
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.stack([self.entries[k][0] for k in self._keys])
+        return self._matrix, self._keys
+
+    def changed(self) -> None:
+        self._matrix = None
+
+
+class SemanticResponseCache:
+    def __init__(
+        self,
+        embed_model: BaseEmbedding,
+        threshold: float = 0.95,
+        max_entries: int = 1000,
+        ttl: float | None = 3600.0,
+    ) -> None:
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._namespaces: dict[str, _Namespace] = {}
+        # global LRU order across namespaces: entry id -> namespace
+        self._lru: OrderedDict[int, str] = OrderedDict()
+        self._next_id = 0
+
+    async def aembed(self, query: str) -> np.ndarray:
+        embedding = np.asarray(
+            await self.embed_model.aget_query_embedding(query), dtype=np.float32
+        )
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def lookup(self, namespace: str, embedding: np.ndarray) -> CachedAnswer | None:
+        ns = self._namespaces.get(namespace)
+        if ns is None or not ns.entries:
+            self.misses += 1
+            return None
+
+        matrix, keys = ns.matrix()
+        scores = matrix @ embedding
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        entry_id = keys[best]
+        answer = ns.entries[entry_id][1]
+        if self.ttl is not None and time.monotonic() - answer.created_at > self.ttl:
+            self._remove(entry_id)
+            self.misses += 1
+            return None
+
+        self._lru.move_to_end(entry_id)
+        self.hits += 1
+        return answer
+
+    def store(
+        self,
+        namespace: str,
+        embedding: np.ndarray,
+        query: str,
+        answer: str,
+        source_nodes: list[NodeWithScore],
+    ) -> None:
+        ns = self._namespaces.setdefault(namespace, _Namespace())
+        entry_id = self._next_id
+        self._next_id += 1
+        ns.entries[entry_id] = (embedding, CachedAnswer(query, answer, source_nodes))
+        ns.changed()
+        self._lru[entry_id] = namespace
+        while len(self._lru) > self.max_entries:
+            self._remove(next(iter(self._lru)))
+
+    def _remove(self, entry_id: int) -> None:
+        namespace = self._lru.pop(entry_id, None)
+        ns = self._namespaces.get(namespace)
+        if ns is not None and ns.entries.pop(entry_id, None) is not None:
+            ns.changed()
+
+    def invalidate(self, prefix: str = "") -> int:
+        """Drop every namespace starting with `prefix`; returns entries removed."""
+        removed = 0
+        for namespace in [n for n in self._namespaces if n.startswith(prefix)]:
+            ns = self._namespaces.pop(namespace)
+            for entry_id in ns.entries:
+                self._lru.pop(entry_id, None)
+            removed += len(ns.entries)
+        return removed
+
+    def stats(self) -> dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._lru),
+        }
+
+
+def record_stream(
+    response: AsyncStreamingResponse, on_complete
+) -> AsyncStreamingResponse:
+    """Wrap a streaming response so `on_complete(text)` runs once it is drained."""
+
+    async def tee() -> AsyncGenerator[str, None]:
+        text = ""
+        async for token in response.async_response_gen():
+            text += token
+            yield token
+        on_complete(text)
+
+    return AsyncStreamingResponse(
+        response_gen=tee(),
+        source_nodes=response.source_nodes,
+        metadata=response.metadata,
+    )
@@ -0,0 +1,151 @@
+"""
+Host many conversations on one workflow instance.
+
+Each session id gets its own `Context`. Turns are limited by a global semaphore
+and a per-session one (so one context never runs twice at once). Sessions that
+sit idle, or that push the live count past `max_live_sessions`, are written to
+`spill_dir` and restored the next time their id shows up; a spilled session with
+no turns waiting keeps nothing in memory.
+"""
+
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+from urllib.parse import quote
+
+from llama_index.core.workflow import Context, JsonPickleSerializer, Workflow
+
+
+class _Session:
+    __slots__ = ("ctx", "lock", "semaphore", "active", "last_used")
+
+    def __init__(self) -> None:
+        self.ctx: Context | None = None
+        self.lock = asyncio.Lock()
+        # a Context holds one run's state; two turns on it at once would
+        # interleave their events and clobber each other's store writes
+        self.semaphore = asyncio.Semaphore(1)
+        # turns running or waiting for the semaphore
+        self.active = 0
+        self.last_used = time.monotonic()
+
+
+class SessionHost:
+    def __init__(
+        self,
+        workflow: Workflow,
+        max_concurrency: int = 64,
+        max_live_sessions: int = 1000,
+        idle_ttl: float | None = 300.0,
+        spill_dir: str | Path | None = None,
+    ) -> None:
+        self.workflow = workflow
+        self.max_live_sessions = max_live_sessions
+        self.idle_ttl = idle_ttl
+        default_dir = Path(__file__).parent / "output" / "sessions"
+        self.spill_dir = Path(spill_dir or default_dir)
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self.serializer = JsonPickleSerializer()
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._sessions: dict[str, _Session] = {}
+        # live contexts in least-recently-used order
+        self._live: OrderedDict[str, None] = OrderedDict()
+        self.restored = 0
+        self.spilled = 0
+
+    def _path(self, session_id: str) -> Path:
+        # percent-escape "/" and "%" so no id can name a path outside spill_dir
+        return self.spill_dir / f"{quote(session_id, safe='')}.json"
+
+    async def run(self, session_id: str, **kwargs: Any) -> Any:
+        """Run one turn of `session_id` and return the workflow result."""
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = _Session()
+
+        # counted before waiting, so evict() won't drop a session someone holds
+        session.active += 1
+        try:
+            async with session.semaphore, self._global:
+                ctx = await self._load(session_id, session)
+                return await self.workflow.run(ctx=ctx, **kwargs)
+        finally:
+            session.active -= 1
+            session.last_used = time.monotonic()
+            await self._enforce_live_limit()
+
+    async def _load(self, session_id: str, session: _Session) -> Context:
+        async with session.lock:
+            if session.ctx is None:
+                path = self._path(session_id)
+                if path.exists():
+                    data = json.loads(await asyncio.to_thread(path.read_text))
+                    session.ctx = Context.from_dict(
+                        self.workflow, data, serializer=self.serializer
+                    )
+                    self.restored += 1
+                else:
+                    session.ctx = Context(self.workflow)
+            self._live[session_id] = None
+            self._live.move_to_end(session_id)
+            return session.ctx
+
+    async def evict(self, session_id: str) -> bool:
+        """Write an idle session to disk and drop its context from memory."""
+        session = self._sessions.get(session_id)
+        if session is None or session.ctx is None or session.active:
+            return False
+
+        async with session.lock:
+            if session.ctx is None or session.active:
+                return False
+            data = session.ctx.to_dict(serializer=self.serializer)
+            path = self._path(session_id)
+            await asyncio.to_thread(path.write_text, json.dumps(data))
+            session.ctx = None
+            self._live.pop(session_id, None)
+            if not session.active:
+                # everything is on disk; the next run() starts a fresh entry
+                del self._sessions[session_id]
+            self.spilled += 1
+            return True
+
+    async def evict_idle(self) -> int:
+        """Spill every session that has been idle for longer than `idle_ttl`."""
+        if self.idle_ttl is None:
+            return 0
+        cutoff = time.monotonic() - self.idle_ttl
+        idle = [
+            session_id
+            for session_id in self._live
+            if self._sessions[session_id].last_used < cutoff
+        ]
+        evicted = 0
+        for session_id in idle:
+            evicted += await self.evict(session_id)
+        return evicted
+
+    async def _enforce_live_limit(self) -> None:
+        if len(self._live) <= self.max_live_sessions:
+            return
+        for session_id in list(self._live):
+            if len(self._live) <= self.max_live_sessions:
+                break
+            await self.evict(session_id)
+
+    async def sweep_forever(self, interval: float = 30.0) -> None:
+        """Background task that spills idle sessions every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "live": len(self._live),
+            "restored": self.restored,
+            "spilled": self.spilled,
+        }
@@ -0,0 +1,110 @@
+"""
+Load test for SessionHost: N concurrent sessions, each running a few ReAct turns
+against the scripted fake LLM. Reports turn latency percentiles and memory per
+session. Memory is measured in a second, separate pass: tracemalloc hooks every
+allocation and would inflate the latencies several times over. Spilled sessions
+go to a temporary directory, so every run starts from scratch.
+
+    python session_load_test.py --sessions 1000 --turns 3 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from llama_index.core.tools import FunctionTool
+
+from fake_llm import ScriptedLLM
+from react_workflow import ReActAgent
+from session_host import SessionHost
+
+
+def add(x: int, y: int) -> int:
+    """Useful function to add two numbers."""
+    return x + y
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def drive_session(
+    host: SessionHost, session_id: str, turns: int, latencies: list[float]
+) -> None:
+    for turn in range(turns):
+        start = time.perf_counter()
+        await host.run(session_id, input=f"turn {turn}: what is 2+3?")
+        latencies.append(time.perf_counter() - start)
+        # think time between user messages
+        await asyncio.sleep(random.uniform(0, 0.01))
+
+
+async def run_sessions(
+    agent: ReActAgent, args: argparse.Namespace, spill_dir: str
+) -> tuple[SessionHost, list[float], float]:
+    host = SessionHost(
+        agent,
+        max_concurrency=args.concurrency,
+        max_live_sessions=args.max_live,
+        spill_dir=spill_dir,
+    )
+    latencies: list[float] = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            drive_session(host, f"session-{i}", args.turns, latencies)
+            for i in range(args.sessions)
+        ]
+    )
+    return host, latencies, time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--max-live", type=int, default=200)
+    parser.add_argument("--token-delay", type=float, default=0.001)
+    args = parser.parse_args()
+
+    llm = ScriptedLLM(token_delay=args.token_delay)
+    agent = ReActAgent(
+        llm=llm, tools=[FunctionTool.from_defaults(add)], timeout=120, verbose=False
+    )
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        host, latencies, elapsed = await run_sessions(agent, args, spill_dir)
+
+    with tempfile.TemporaryDirectory() as spill_dir:
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        memory_host, _, _ = await run_sessions(agent, args, spill_dir)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    live = max(1, memory_host.stats()["live"])
+    print(f"sessions={args.sessions} turns={len(latencies)} wall={elapsed:.2f}s")
+    print(f"throughput: {len(latencies) / elapsed:.1f} turns/s")
+    print(
+        "turn latency ms:"
+        f" p50={percentile(latencies, 50) * 1000:.1f}"
+        f" p95={percentile(latencies, 95) * 1000:.1f}"
+        f" p99={percentile(latencies, 99) * 1000:.1f}"
+        f" mean={statistics.mean(latencies) * 1000:.1f}"
+    )
+    print(
+        f"memory: {(current - baseline) / live / 1024:.1f} KiB per live session,"
+        f" peak {peak / 1024 / 1024:.1f} MiB"
+    )
+    print(host.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,16 +1,15 @@
+from typing import Any
+
+from llama_index.core.llms.llm import LLM
 from workflows import Workflow, step
 from workflows.events import (
     Event,
     StartEvent,
     StopEvent,
 )
-from llama_index.llms.openai import OpenAI
-
-from llama_index.core import set_global_handler
 
-# Enable Phoenix tracing - will connect to Phoenix at localhost:6006
-set_global_handler("arize_phoenix")
-print("Connected to Phoenix at http://localhost:6006")
+from client_pool import get_llm
+from tracing import configure_tracing
 
 
 class JokeEvent(Event):
@@ -18,7 +17,10 @@ class JokeEvent(Event):
 
 
 class JokeFlow(Workflow):
-    llm = OpenAI(model="gpt-5.2", temperature=0, reasoning_effort="none")
+    def __init__(self, *args: Any, llm: LLM | None = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # resolved per instance, not at import, so configure_pool() can still run
+        self.llm = llm or get_llm("gpt-5.2", temperature=0, reasoning_effort="none")
 
     @step
     async def generate_joke(self, ev: StartEvent) -> JokeEvent:
@@ -38,6 +40,9 @@ class JokeFlow(Workflow):
 
 
 async def main():
+    # opt-in: set TRACING_MODE=phoenix|file|otlp to trace this run
+    configure_tracing()
+
     w = JokeFlow(timeout=60, verbose=False)
     result = await w.run(topic="pirates")
     print(str(result))
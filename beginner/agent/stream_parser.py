@@ -0,0 +1,100 @@
+"""
+Detect a complete ReAct action while the LLM is still streaming.
+
+`ReActOutputParser.parse` needs the full message. For tool-using turns everything
+after the closing brace of `Action Input` is noise, so `StreamingActionDetector`
+watches the deltas and returns the `ActionReasoningStep` as soon as the JSON
+object is balanced and parses. Anything it can't handle (final answers, non-JSON
+inputs) is left to the regular parser once the stream ends.
+"""
+
+import json
+import re
+
+from llama_index.core.agent.react.types import ActionReasoningStep
+
+ACTION_PATTERN = re.compile(
+    r"(?:\s*Thought:\s*(.*?)|(.*?))\n+Action:\s*([^\n\(\) ]+)", re.DOTALL
+)
+
+
+class StreamingActionDetector:
+    def __init__(self) -> None:
+        self.text = ""
+        self.done = False
+        # JSON scan state, carried over between deltas
+        self._json_start = -1
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, delta: str) -> ActionReasoningStep | None:
+        """Add a delta; return the action once it is complete, else None."""
+        if self.done or not delta:
+            return None
+        self.text += delta
+
+        if self._json_start < 0:
+            if "Answer:" in self.text:
+                # final answer turn, nothing to dispatch early
+                self.done = True
+                return None
+            marker = self.text.find("Action Input:")
+            if marker < 0:
+                return None
+            brace = self.text.find("{", marker)
+            if brace < 0:
+                return None
+            self._json_start = brace
+            self._pos = brace
+
+        end = self._scan()
+        if end < 0:
+            return None
+
+        self.done = True
+        return self._build_step(end)
+
+    def _scan(self) -> int:
+        """Advance the brace matcher over new text; return the end index or -1."""
+        text = self.text
+        while self._pos < len(text):
+            char = text[self._pos]
+            self._pos += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    return self._pos
+        return -1
+
+    def _build_step(self, end: int) -> ActionReasoningStep | None:
+        head = self.text[: self.text.find("Action Input:")]
+        match = ACTION_PATTERN.search(head)
+        if not match:
+            return None
+
+        try:
+            action_input = json.loads(self.text[self._json_start : end])
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(action_input, dict):
+            return None
+
+        thought = (match.group(1) or match.group(2) or "").strip()
+        return ActionReasoningStep(
+            thought=thought,
+            action=match.group(3).strip(),
+            action_input=action_input,
+        )
@@ -0,0 +1,212 @@
+"""
+Precomputed, persisted summary hierarchy for summarization questions.
+
+Chunks of each document are grouped about `fanout` at a time and summarized,
+those summaries are grouped and summarized again, up to one root per document
+(and a corpus root above several documents). Every tree node is keyed by a hash
+of its children, and summaries are stored under that key, so after an edit only
+the ancestors of changed chunks get new keys and need LLM calls; everything else
+is reused from the persisted file. Groups end where a child's key hash says so
+(content-defined, like chunking in rsync or restic), not every `fanout`
+positions, so inserting or deleting a chunk only changes its own group instead
+of shifting every later one.
+
+`SummaryTreeQueryEngine` answers from the most detailed level that still fits
+in `max_context_chars`, which is usually one LLM call for a whole-document
+question instead of one per chunk.
+"""
+
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+
+from llama_index.core.async_utils import asyncio_run
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import Response
+from llama_index.core.llms.llm import LLM
+from llama_index.core.prompts import PromptTemplate
+from llama_index.core.response_synthesizers import TreeSummarize
+from llama_index.core.schema import (
+    BaseNode,
+    MetadataMode,
+    NodeWithScore,
+    QueryBundle,
+    TextNode,
+)
+
+SUMMARY_TREE_NAME = "summary_tree.json"
+SUMMARY_PROMPT = PromptTemplate(
+    "Summarize the following passages from one document in a single paragraph, "
+    "keeping names, dates and key events.\n"
+    "---------------------\n"
+    "{context_str}\n"
+    "---------------------\n"
+    "Summary: "
+)
+
+
+def _key(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()[:32]
+
+
+def group_keys(keys: list[str], fanout: int) -> list[list[str]]:
+    """Split `keys` into groups of about `fanout`, ending on content boundaries.
+
+    A group ends after a key whose hash is 0 mod `fanout`, so the cut points
+    move with the content rather than with positions. Groups are capped at
+    4 * `fanout`; a level that would not at least halve falls back to fixed
+    slices, so every level is smaller than the one below it.
+    """
+    if fanout < 2:
+        raise ValueError("fanout must be at least 2")
+    groups: list[list[str]] = [[]]
+    for key in keys:
+        groups[-1].append(key)
+        if int(key[:8], 16) % fanout == 0 or len(groups[-1]) >= 4 * fanout:
+            groups.append([])
+    groups = [group for group in groups if group]
+    if len(keys) > 1 and len(groups) > -(-len(keys) // 2):
+        groups = [keys[i : i + fanout] for i in range(0, len(keys), fanout)]
+    return groups
+
+
+class SummaryTree:
+    def __init__(
+        self,
+        llm: LLM,
+        persist_path: str | Path,
+        fanout: int = 4,
+        max_concurrency: int = 8,
+    ) -> None:
+        if fanout < 2:
+            # a fanout of 1 never merges anything, so the tree would never end
+            raise ValueError("fanout must be at least 2")
+        self.llm = llm
+        self.persist_path = Path(persist_path)
+        self.fanout = fanout
+        self.max_concurrency = max_concurrency
+        self._semaphore: asyncio.Semaphore | None = None
+        self._summarized = 0
+        self._reused = 0
+        # summary key -> text, reused across rebuilds
+        self.summaries: dict[str, str] = {}
+        # levels[0] are the chunks; levels[-1] is the root level
+        self.levels: list[list[str]] = []
+        if self.persist_path.exists():
+            data = json.loads(self.persist_path.read_text())
+            self.summaries = data["summaries"]
+            self.levels = data["levels"]
+
+    def persist(self) -> None:
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"summaries": self.summaries, "levels": self.levels}
+        self.persist_path.write_text(json.dumps(data))
+
+    def is_current(self, nodes: list[BaseNode]) -> bool:
+        chunks = {_key("chunk", node.get_content(MetadataMode.NONE)) for node in nodes}
+        return bool(self.levels) and chunks == set(self.levels[0])
+
+    async def _summarize(self, key: str, children: list[str]) -> None:
+        if key in self.summaries:
+            self._reused += 1
+            return
+        async with self._semaphore:
+            context = "\n\n".join(self.summaries[child] for child in children)
+            self.summaries[key] = await self.llm.apredict(
+                SUMMARY_PROMPT, context_str=context
+            )
+        self._summarized += 1
+
+    async def abuild(self, nodes: list[BaseNode]) -> dict[str, int]:
+        """(Re)build the tree over `nodes`; only new keys cost an LLM call."""
+        self._summarized = self._reused = 0
+        # per build: each build may run on its own event loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        documents: dict[str, list[BaseNode]] = {}
+        for node in nodes:
+            documents.setdefault(node.ref_doc_id or node.node_id, []).append(node)
+
+        # per document: its levels from chunks up to its root
+        doc_levels: list[list[list[str]]] = []
+        for doc_nodes in documents.values():
+            doc_nodes.sort(key=lambda node: node.start_char_idx or 0)
+            keys = []
+            for node in doc_nodes:
+                text = node.get_content(MetadataMode.NONE)
+                key = _key("chunk", text)
+                self.summaries[key] = text
+                keys.append(key)
+            levels = [keys]
+            while len(keys) > 1:
+                keys = await self._build_level(keys, len(levels))
+                levels.append(keys)
+            doc_levels.append(levels)
+
+        # shallow documents carry their root up so every level covers the corpus
+        depth = max((len(levels) for levels in doc_levels), default=0)
+        self.levels = [
+            [key for levels in doc_levels for key in levels[min(d, len(levels) - 1)]]
+            for d in range(depth)
+        ]
+        while self.levels and len(self.levels[-1]) > 1:
+            self.levels.append(
+                await self._build_level(self.levels[-1], len(self.levels))
+            )
+
+        live = {key for level in self.levels for key in level}
+        self.summaries = {k: v for k, v in self.summaries.items() if k in live}
+        self.persist()
+        return {"summarized": self._summarized, "reused": self._reused}
+
+    async def _build_level(self, children: list[str], depth: int) -> list[str]:
+        groups = group_keys(children, self.fanout)
+        keys = [_key(str(depth), *group) for group in groups]
+        await asyncio.gather(
+            *(self._summarize(key, group) for key, group in zip(keys, groups))
+        )
+        return keys
+
+    def build(self, nodes: list[BaseNode]) -> dict[str, int]:
+        return asyncio_run(self.abuild(nodes))
+
+    def texts_for(self, max_context_chars: int) -> tuple[int, list[str]]:
+        """The most detailed summary level (above the chunks) that fits."""
+        if not self.levels:
+            return 0, []
+        for depth in range(1, len(self.levels)):
+            texts = [self.summaries[key] for key in self.levels[depth]]
+            if sum(len(text) for text in texts) <= max_context_chars:
+                return depth, texts
+        depth = len(self.levels) - 1
+        return depth, [self.summaries[key] for key in self.levels[depth]]
+
+
+class SummaryTreeQueryEngine(BaseQueryEngine):
+    def __init__(
+        self, tree: SummaryTree, llm: LLM, max_context_chars: int = 12_000
+    ) -> None:
+        super().__init__(callback_manager=None)
+        self.tree = tree
+        self.max_context_chars = max_context_chars
+        self.summarizer = TreeSummarize(llm=llm)
+
+    def _get_prompt_modules(self) -> dict:
+        return {"summarizer": self.summarizer}
+
+    def _response(self, answer: str, depth: int, texts: list[str]) -> Response:
+        return Response(
+            response=str(answer),
+            source_nodes=[NodeWithScore(node=TextNode(text=t)) for t in texts],
+            metadata={"summary_level": depth},
+        )
+
+    def _query(self, query_bundle: QueryBundle) -> Response:
+        depth, texts = self.tree.texts_for(self.max_context_chars)
+        answer = self.summarizer.get_response(query_bundle.query_str, texts)
+        return self._response(answer, depth, texts)
+
+    async def _aquery(self, query_bundle: QueryBundle) -> Response:
+        depth, texts = self.tree.texts_for(self.max_context_chars)
+        answer = await self.summarizer.aget_response(query_bundle.query_str, texts)
+        return self._response(answer, depth, texts)
@@ -0,0 +1,51 @@
+import asyncio
+import json
+
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.tools import FunctionTool, ToolSelection
+
+from tool_executor import ToolExecutor
+from tracing import SampledSpanHandler, SpanExporter
+
+
+def add(x: int, y: int) -> int:
+    """Add two numbers."""
+    return x + y
+
+
+def make_handler(tmp_path, **kwargs) -> SampledSpanHandler:
+    exporter = SpanExporter("file", path=tmp_path / "traces.jsonl")
+    return SampledSpanHandler(exporter, **kwargs)
+
+
+def test_handler_takes_sampling_settings(tmp_path):
+    handler = make_handler(tmp_path, default_rate=0.0, rates={"ToolExecutor": 1.0})
+    assert handler.default_rate == 0.0
+    assert handler.rates == {"ToolExecutor": 1.0}
+    assert handler.new_span("a-1", None, instance=object()) is None
+    span = handler.new_span("b-1", None, instance=ToolExecutor())
+    assert span is not None and span.name == "b"
+
+
+def test_sync_tool_span_keeps_its_parent(tmp_path):
+    handler = make_handler(tmp_path)
+    dispatcher = get_dispatcher()
+    dispatcher.add_span_handler(handler)
+    tool = FunctionTool.from_defaults(add)
+    call = ToolSelection(tool_id="1", tool_name="add", tool_kwargs={"x": 1, "y": 2})
+
+    @dispatcher.span
+    async def turn() -> None:
+        await ToolExecutor().execute([(tool, call)])
+
+    try:
+        asyncio.run(turn())
+    finally:
+        dispatcher.span_handlers.remove(handler)
+    handler._exporter.flush()
+
+    lines = (tmp_path / "traces.jsonl").read_text().splitlines()
+    spans = [json.loads(line) for line in lines]
+    tool_spans = [span for span in spans if span["name"] == "FunctionTool.__call__"]
+    assert tool_spans
+    assert all(span["parent_id"] is not None for span in tool_spans)
@@ -0,0 +1,70 @@
+"""
+Memoized results for deterministic tools.
+
+Only tools listed in `tools` are cached. Entries are keyed by tool name plus the
+normalized kwargs and evicted by LRU order and TTL.
+"""
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any
+
+from llama_index.core.tools import ToolOutput
+
+
+class ToolResultCache:
+    def __init__(
+        self,
+        tools: set[str] | list[str],
+        max_size: int = 1024,
+        ttl: float | None = 600.0,
+    ) -> None:
+        self.tools = set(tools)
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[float, ToolOutput]] = OrderedDict()
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        return tool_name in self.tools
+
+    @staticmethod
+    def make_key(tool_name: str, tool_kwargs: dict[str, Any]) -> str:
+        # sort_keys makes {"x": 1, "y": 2} and {"y": 2, "x": 1} share a slot
+        return tool_name + ":" + json.dumps(tool_kwargs, sort_keys=True, default=str)
+
+    def get(self, key: str) -> ToolOutput | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        stored_at, output = entry
+        if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return output
+
+    def put(self, key: str, output: ToolOutput) -> None:
+        self._entries[key] = (time.monotonic(), output)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._entries),
+        }
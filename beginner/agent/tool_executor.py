@@ -0,0 +1,111 @@
+"""
+Run ReAct tool calls concurrently without blocking the event loop.
+
+Async tools are awaited through `acall`, sync tools are pushed onto a bounded
+thread pool. Every tool gets its own timeout and concurrency limit, and results
+come back in the same order as the calls. An optional `ToolResultCache`
+short-circuits repeated calls to deterministic tools.
+"""
+
+import asyncio
+import contextvars
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from llama_index.core.tools import ToolOutput, ToolSelection
+from llama_index.core.tools.types import AsyncBaseTool, BaseTool
+
+from tool_cache import ToolResultCache
+
+
+def is_async_tool(tool: BaseTool) -> bool:
+    """True if the tool has a native coroutine we can await directly."""
+    if not isinstance(tool, AsyncBaseTool):
+        return False
+    # FunctionTool wraps sync functions in an async shim; route those to our pool
+    real_fn = getattr(tool, "real_fn", None)
+    return real_fn is None or inspect.iscoroutinefunction(real_fn)
+
+
+class ToolExecutor:
+    def __init__(
+        self,
+        max_workers: int = 8,
+        default_timeout: float | None = 30.0,
+        default_concurrency: int = 4,
+        timeouts: dict[str, float] | None = None,
+        concurrency: dict[str, int] | None = None,
+        cache: ToolResultCache | None = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.default_timeout = default_timeout
+        self.default_concurrency = default_concurrency
+        self.timeouts = timeouts or {}
+        self.concurrency = concurrency or {}
+        self.cache = cache
+        self._pool: ThreadPoolExecutor | None = None
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="tool"
+            )
+        return self._pool
+
+    def _semaphore(self, name: str) -> asyncio.Semaphore:
+        if name not in self._semaphores:
+            limit = self.concurrency.get(name, self.default_concurrency)
+            self._semaphores[name] = asyncio.Semaphore(limit)
+        return self._semaphores[name]
+
+    async def _run_one(self, tool: BaseTool, tool_call: ToolSelection) -> ToolOutput:
+        name = tool.metadata.get_name()
+        timeout = self.timeouts.get(name, self.default_timeout)
+
+        cache_key = None
+        if self.cache is not None and self.cache.is_cacheable(name):
+            cache_key = self.cache.make_key(name, tool_call.tool_kwargs)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        output = await self._invoke(tool, tool_call, name, timeout)
+        if cache_key is not None and not output.is_error:
+            self.cache.put(cache_key, output)
+        return output
+
+    async def _invoke(
+        self,
+        tool: BaseTool,
+        tool_call: ToolSelection,
+        name: str,
+        timeout: float | None,
+    ) -> ToolOutput:
+        async with self._semaphore(name):
+            if is_async_tool(tool):
+                coro = tool.acall(**tool_call.tool_kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                # run_in_executor doesn't copy contextvars; without them the
+                # tool's span would lose its parent and start a new trace
+                call = partial(
+                    contextvars.copy_context().run, tool, **tool_call.tool_kwargs
+                )
+                # a timed-out thread keeps running, but the loop stops waiting on it
+                coro = loop.run_in_executor(self.pool, call)
+            return await asyncio.wait_for(coro, timeout=timeout)
+
+    async def execute(
+        self, calls: list[tuple[BaseTool, ToolSelection]]
+    ) -> list[ToolOutput | BaseException]:
+        """Run all calls at once; exceptions are returned in place of outputs."""
+        tasks = [self._run_one(tool, tool_call) for tool, tool_call in calls]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
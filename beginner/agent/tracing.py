@@ -0,0 +1,281 @@
+"""
+Opt-in, sampled tracing.
+
+Nothing is traced unless `configure_tracing()` is called with a mode, or the
+`TRACING_MODE` env var is set. Modes:
+
+- "off" (default): no span handler is registered at all.
+- "phoenix": the previous behaviour, `set_global_handler("arize_phoenix")`.
+- "file" / "otlp": spans go through `SampledSpanHandler`, which decides once per
+  root span (head sampling, rate per workflow class), keeps finished spans in a
+  bounded ring buffer and flushes them in batches from a background thread to a
+  JSONL file or an OTLP/HTTP JSON endpoint.
+
+Env vars: TRACING_MODE, TRACING_SAMPLE_RATE (default 1.0), TRACING_SAMPLE_RATES
+("RAGWorkflow=0.1,ReActAgent=1"), TRACING_FILE, OTEL_EXPORTER_OTLP_ENDPOINT.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.instrumentation import get_dispatcher
+from llama_index.core.instrumentation.span import BaseSpan
+from llama_index.core.instrumentation.span_handlers import BaseSpanHandler
+
+
+class SampledSpan(BaseSpan):
+    name: str = ""
+    trace_id: str = ""
+    start_ns: int = 0
+    end_ns: int = 0
+    error: str | None = None
+
+
+class SpanExporter:
+    def __init__(
+        self,
+        mode: str,
+        path: str | Path | None = None,
+        endpoint: str | None = None,
+        max_buffer: int = 10_000,
+        batch_size: int = 512,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.mode = mode
+        self.path = Path(path or Path(__file__).parent / "output" / "traces.jsonl")
+        endpoint = (endpoint or "http://localhost:4318").rstrip("/")
+        if not endpoint.endswith("/v1/traces"):
+            endpoint += "/v1/traces"
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # oldest spans are dropped when nobody drains the buffer fast enough
+        self.buffer: deque[SampledSpan] = deque(maxlen=max_buffer)
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def add(self, span: SampledSpan) -> None:
+        self.buffer.append(span)
+        if len(self.buffer) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Trace export failed: {e}")
+
+    def _drain(self) -> list[SampledSpan]:
+        batch = []
+        while self.buffer and len(batch) < self.batch_size:
+            batch.append(self.buffer.popleft())
+        return batch
+
+    def flush(self) -> None:
+        while batch := self._drain():
+            if self.mode == "file":
+                self._write_file(batch)
+            else:
+                self._post_otlp(batch)
+
+    def _write_file(self, batch: list[SampledSpan]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as f:
+            for span in batch:
+                f.write(span.model_dump_json() + "\n")
+
+    def _post_otlp(self, batch: list[SampledSpan]) -> None:
+        spans = []
+        for span in batch:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": _hex_id(span.id_, 8),
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "status": {
+                    "code": 2 if span.error else 1,
+                    "message": span.error or "",
+                },
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = _hex_id(span.parent_id, 8)
+            spans.append(otlp_span)
+
+        body = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "sam_agents"},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+                }
+            ]
+        }
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        urllib.request.urlopen(request, timeout=10).close()
+
+
+def _hex_id(value: str, size: int) -> str:
+    return hashlib.blake2b(value.encode(), digest_size=size).hexdigest()
+
+
+class SampledSpanHandler(BaseSpanHandler[SampledSpan]):
+    default_rate: float = Field(default=1.0)
+    rates: dict[str, float] = Field(default_factory=dict)
+
+    _exporter: SpanExporter = PrivateAttr()
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        default_rate: float = 1.0,
+        rates: dict[str, float] | None = None,
+    ) -> None:
+        # BaseSpanHandler.__init__ only takes its own span bookkeeping fields
+        super().__init__()
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self._exporter = exporter
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "SampledSpanHandler"
+
+    def new_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Any | None = None,
+        parent_span_id: str | None = None,
+        tags: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> SampledSpan | None:
+        if parent_span_id is not None:
+            # children follow the root's decision: an unsampled parent is never open
+            parent = self.open_spans.get(parent_span_id)
+            if parent is None:
+                return None
+            trace_id = parent.trace_id
+        else:
+            rate = self.rates.get(type(instance).__name__, self.default_rate)
+            if rate <= 0 or random.random() >= rate:
+                return None
+            trace_id = _hex_id(id_, 16)
+
+        return SampledSpan(
+            id_=id_,
+            parent_id=parent_span_id,
+            tags=tags or {},
+            name=id_.partition("-")[0],
+            trace_id=trace_id,
+            start_ns=time.time_ns(),
+        )
+
+    def prepare_to_exit_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Any | None = None,
+        result: Any | None = None,
+        **kwargs: Any,
+    ) -> SampledSpan | None:
+        span = self.open_spans.get(id_)
+        if span is None:
+            return None
+        span.end_ns = time.time_ns()
+        self._exporter.add(span)
+        return span
+
+    def prepare_to_drop_span(
+        self,
+        id_: str,
+        bound_args: Any,
+        instance: Any | None = None,
+        err: BaseException | None = None,
+        **kwargs: Any,
+    ) -> SampledSpan | None:
+        span = self.open_spans.get(id_)
+        if span is None:
+            return None
+        span.end_ns = time.time_ns()
+        span.error = repr(err)
+        self._exporter.add(span)
+        return span
+
+
+def _parse_rates(raw: str) -> dict[str, float]:
+    rates = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+_configured: str | None = None
+
+
+def configure_tracing(
+    mode: str | None = None,
+    sample_rate: float | None = None,
+    sample_rates: dict[str, float] | None = None,
+    path: str | Path | None = None,
+    endpoint: str | None = None,
+) -> str:
+    """Enable tracing once per process; returns the active mode."""
+    global _configured
+    if _configured is not None:
+        return _configured
+
+    mode = (mode or os.environ.get("TRACING_MODE", "off")).lower()
+    if mode == "phoenix":
+        from llama_index.core import set_global_handler
+
+        # connects to Phoenix at localhost:6006
+        set_global_handler("arize_phoenix")
+        print("Connected to Phoenix at http://localhost:6006")
+    elif mode in ("file", "otlp"):
+        if sample_rate is None:
+            sample_rate = float(os.environ.get("TRACING_SAMPLE_RATE", "1.0"))
+        if sample_rates is None:
+            sample_rates = _parse_rates(os.environ.get("TRACING_SAMPLE_RATES", ""))
+        exporter = SpanExporter(
+            mode,
+            path=path or os.environ.get("TRACING_FILE"),
+            endpoint=endpoint or os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT"),
+        )
+        handler = SampledSpanHandler(
+            exporter, default_rate=sample_rate, rates=sample_rates
+        )
+        get_dispatcher().add_span_handler(handler)
+    elif mode != "off":
+        raise ValueError(f"Unknown tracing mode: {mode}")
+
+    _configured = mode
+    return mode
@@ -0,0 +1,280 @@
+"""
+Concurrent streaming latency benchmark for LlamaIndex and raw OpenAI clients.
+
+    python bench.py run --mix llamaindex:gpt-5-mini=2 responses:gpt-5-mini=1 \\
+        --requests 200 --concurrency 16 --out results/base.json
+    python bench.py compare results/base.json results/new.json --threshold 0.1
+
+`run` keeps `--concurrency` requests in flight until `--requests` have been sent,
+picking targets from `--mix` by weight. Every request streams; TTFT is the time
+to the first non-empty text delta, inter-token latency the gap between deltas,
+and total the time to the end of the stream. Results are p50/p95/p99 per target,
+written as JSON. `compare` flags metrics that got slower by more than
+`--threshold` and exits non-zero if any did.
+
+All targets share one keep-alive connection pool (`--pool-size`, `--http2`), so
+connection setup is paid once per connection rather than per target. Both
+clients honour OPENAI_BASE_URL, so the same run can target a local server.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+from llama_index.llms.openai import OpenAI as LlamaIndexOpenAI
+from openai import AsyncOpenAI
+
+METRICS = ("ttft", "inter_token", "total")
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile; None for no data."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(q / 100 * len(ordered)) - 1
+    return ordered[max(0, min(len(ordered) - 1, rank))]
+
+
+class Target:
+    """One client/model pair, e.g. `responses:gpt-5-mini`."""
+
+    def __init__(
+        self,
+        spec: str,
+        prompt: str,
+        service_tier: str | None,
+        http_client: httpx.AsyncClient,
+        client: AsyncOpenAI,
+    ) -> None:
+        self.name = spec
+        self.client_kind, self.model = spec.split(":", 1)
+        self.prompt = prompt
+        self.service_tier = service_tier
+        if self.client_kind == "llamaindex":
+            self.llm = LlamaIndexOpenAI(
+                model=self.model, async_http_client=http_client
+            )
+        elif self.client_kind in ("responses", "chat"):
+            self.client = client
+        else:
+            raise ValueError(f"Unknown client {self.client_kind!r} in {spec!r}")
+
+    async def stream(self):
+        """Yield text deltas for one request."""
+        if self.client_kind == "llamaindex":
+            async for chunk in await self.llm.astream_complete(self.prompt):
+                yield chunk.delta or ""
+        elif self.client_kind == "responses":
+            extra = {"service_tier": self.service_tier} if self.service_tier else {}
+            events = await self.client.responses.create(
+                model=self.model, input=self.prompt, stream=True, **extra
+            )
+            async for event in events:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+        else:
+            chunks = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": self.prompt}],
+                stream=True,
+            )
+            async for chunk in chunks:
+                if chunk.choices:
+                    yield chunk.choices[0].delta.content or ""
+
+
+async def measure(target: Target) -> dict:
+    start = time.perf_counter()
+    first = last = None
+    gaps = []
+    tokens = 0
+    try:
+        async for delta in target.stream():
+            if not delta:
+                continue
+            now = time.perf_counter()
+            if first is None:
+                first = now
+            else:
+                gaps.append(now - last)
+            last = now
+            tokens += 1
+    except Exception as e:
+        return {"target": target.name, "error": f"{type(e).__name__}: {e}"}
+    end = time.perf_counter()
+    return {
+        "target": target.name,
+        "ttft": None if first is None else first - start,
+        "inter_token": gaps,
+        "total": end - start,
+        "tokens": tokens,
+    }
+
+
+async def run_load(
+    targets: list[Target], weights: list[float], requests: int, concurrency: int
+) -> tuple[list[dict], float]:
+    rng = random.Random(0)
+    plan = rng.choices(targets, weights=weights, k=requests)
+    queue: asyncio.Queue[Target] = asyncio.Queue()
+    for target in plan:
+        queue.put_nowait(target)
+    samples: list[dict] = []
+
+    async def worker():
+        while not queue.empty():
+            samples.append(await measure(queue.get_nowait()))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples: list[dict], wall_s: float) -> dict:
+    by_target: dict[str, list[dict]] = {}
+    for sample in samples:
+        by_target.setdefault(sample["target"], []).append(sample)
+
+    summary = {}
+    for name, group in by_target.items():
+        ok = [s for s in group if "error" not in s]
+        values = {
+            "ttft": [s["ttft"] for s in ok if s["ttft"] is not None],
+            "inter_token": [gap for s in ok for gap in s["inter_token"]],
+            "total": [s["total"] for s in ok],
+        }
+        summary[name] = {
+            "requests": len(group),
+            "errors": len(group) - len(ok),
+            "throughput_rps": len(ok) / wall_s if wall_s else 0.0,
+            **{
+                metric: {f"p{q}": percentile(values[metric], q) for q in PERCENTILES}
+                for metric in METRICS
+            },
+        }
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    header = f"{'target':<32}{'req':>6}{'err':>5}"
+    for metric in METRICS:
+        header += "".join(f"{metric[:5] + ' p' + str(q):>14}" for q in PERCENTILES)
+    print(header)
+    for name, row in summary.items():
+        line = f"{name:<32}{row['requests']:>6}{row['errors']:>5}"
+        for metric in METRICS:
+            for q in PERCENTILES:
+                value = row[metric][f"p{q}"]
+                line += f"{'-' if value is None else f'{value * 1000:.1f}ms':>14}"
+        print(line)
+
+
+def cmd_run(args) -> int:
+    async def run() -> tuple[list[dict], float]:
+        # one pool for every target, created inside the loop that uses it
+        limits = httpx.Limits(
+            max_connections=args.pool_size, max_keepalive_connections=args.pool_size
+        )
+        async with httpx.AsyncClient(limits=limits, http2=args.http2) as http_client:
+            client = AsyncOpenAI(http_client=http_client)
+            targets, weights = [], []
+            for item in args.mix:
+                spec, _, weight = item.partition("=")
+                targets.append(
+                    Target(spec, args.prompt, args.service_tier, http_client, client)
+                )
+                weights.append(float(weight or 1))
+            return await run_load(targets, weights, args.requests, args.concurrency)
+
+    samples, wall_s = asyncio.run(run())
+    summary = summarize(samples, wall_s)
+    print_summary(summary)
+
+    result = {
+        "config": {
+            "mix": args.mix,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "prompt": args.prompt,
+            "pool_size": args.pool_size,
+            "http2": args.http2,
+        },
+        "wall_s": wall_s,
+        "summary": summary,
+    }
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"Wrote {args.out}")
+    return 0
+
+
+def cmd_compare(args) -> int:
+    base = json.loads(Path(args.base).read_text())["summary"]
+    new = json.loads(Path(args.new).read_text())["summary"]
+    regressions = 0
+    for name in sorted(base.keys() & new.keys()):
+        for metric in METRICS:
+            for q in PERCENTILES:
+                old = base[name][metric][f"p{q}"]
+                cur = new[name][metric][f"p{q}"]
+                if not old or cur is None:
+                    continue
+                change = cur / old - 1
+                flag = "REGRESSION" if change > args.threshold else ""
+                regressions += bool(flag)
+                label = f"{metric} p{q}"
+                print(
+                    f"{name:<32}{label:>16}{old * 1000:>10.1f}ms"
+                    f"{cur * 1000:>10.1f}ms{change:>+9.1%}  {flag}"
+                )
+        if new[name]["errors"] > base[name]["errors"]:
+            regressions += 1
+            old, cur = base[name]["errors"], new[name]["errors"]
+            print(f"{name:<32}{'errors':>16}{old:>12}{cur:>12}  REGRESSION")
+    for name in sorted(base.keys() ^ new.keys()):
+        print(f"{name:<32} only in {'base' if name in base else 'new'}")
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="drive load and record latencies")
+    run.add_argument(
+        "--mix",
+        nargs="+",
+        default=["llamaindex:gpt-5-mini", "responses:gpt-5-mini"],
+        help="client:model[=weight], client is llamaindex, responses or chat",
+    )
+    run.add_argument("--requests", type=int, default=50)
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--prompt", default="hi")
+    run.add_argument("--service-tier", default=None)
+    run.add_argument("--pool-size", type=int, default=64)
+    run.add_argument("--http2", action="store_true", help="needs httpx[http2]")
+    run.add_argument("--out", default=None, help="write JSON results here")
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser("compare", help="flag regressions between two runs")
+    compare.add_argument("base")
+    compare.add_argument("new")
+    compare.add_argument("--threshold", type=float, default=0.10)
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())